@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.api.deps import require_admin_role
+from app.utils.cache import cache_stats
 from .endpoints import auth, users, addresses, categories, products, cart, orders
 
 api_router = APIRouter()
@@ -17,3 +19,7 @@ api_router.include_router(orders.admin_router)
 async def ping():
     return {"message": "pong"}
 
+
+@api_router.get("/admin/cache/stats", dependencies=[Depends(require_admin_role)])
+def get_cache_stats():
+    return cache_stats()
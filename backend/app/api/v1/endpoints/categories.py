@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, union
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.api.deps import get_db_dep, require_admin_role
 from app.models.category import Category
 from app.models.product import Product
 from app.models.product_category import ProductCategory
+from app.schemas.product import ProductSummaryListResponse
 from app.schemas.category import CategoryResponse, CategoryListResponse, CategoryTreeResponse, CategoryCreate, CategoryUpdate
 from app.utils.helpers import slugify
+from app.services.category_tree import add_category, descendant_ids, is_descendant, move_category, refresh_subtree_paths, subtree_height
+from app.utils.pagination import paginate
+from app.utils.ordering import apply_positions, position_map
+from app.utils.cache import tree_cache
+from app.utils.http_cache import cached_json
+from app.services.product_listing import PRODUCT_KEYSETS, PRODUCT_RELATIONS, PRODUCT_SUMMARY_COLUMNS
 
 MAX_CATEGORY_DEPTH = 5
 
@@ -33,22 +41,25 @@ def list_categories(db: Session = Depends(get_db_dep), hierarchical: bool = Quer
     return [attach(r) for r in roots]
 
 @router.get("/tree", response_model=CategoryTreeResponse)
-def get_tree(db: Session = Depends(get_db_dep)):
-    cats = db.query(Category).filter(Category.is_active == True).order_by(Category.sort_order, Category.name).all()
-    id_map = {c.id: c for c in cats}
-    children_map: dict[str, list[Category]] = {c.id: [] for c in cats}
-    roots: list[Category] = []
-    for c in cats:
-        if c.parent_id and c.parent_id in id_map:
-            children_map[c.parent_id].append(c)
-        else:
-            roots.append(c)
-    def attach(c: Category) -> Category:
-        c.children = children_map.get(c.id, [])  # type: ignore
-        for ch in c.children:  # type: ignore
-            attach(ch)
-        return c
-    return {"items": [attach(r) for r in roots]}
+def get_tree(request: Request, db: Session = Depends(get_db_dep)):
+    def build(db: Session):
+        cats = db.query(Category).filter(Category.is_active == True).order_by(Category.sort_order, Category.name).all()
+        id_map = {c.id: c for c in cats}
+        children_map: dict[str, list[Category]] = {c.id: [] for c in cats}
+        roots: list[Category] = []
+        for c in cats:
+            if c.parent_id and c.parent_id in id_map:
+                children_map[c.parent_id].append(c)
+            else:
+                roots.append(c)
+        def attach(c: Category) -> Category:
+            c.children = children_map.get(c.id, [])  # type: ignore
+            for ch in c.children:  # type: ignore
+                attach(ch)
+            return c
+        tree = CategoryTreeResponse.model_validate({"items": [attach(r) for r in roots]})
+        return tree.model_dump(mode="json")
+    return cached_json(request, tree_cache, "category-tree", build, db)
 
 @router.get("/{slug}", response_model=CategoryResponse)
 def get_category(slug: str, db: Session = Depends(get_db_dep)):
@@ -57,13 +68,16 @@ def get_category(slug: str, db: Session = Depends(get_db_dep)):
         raise HTTPException(status_code=404, detail="Category not found")
     return cat
 
-@router.get("/{slug}/products")
+@router.get("/{slug}/products", response_model=ProductSummaryListResponse)
 def get_category_products(
     slug: str,
     db: Session = Depends(get_db_dep),
     page: int = 1,
     limit: int = 20,
     include_subcategories: bool = True,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total_mode: str = Query("exact", pattern="^(exact|estimated)$"),
 ):
     if page < 1:
         page = 1
@@ -71,14 +85,17 @@ def get_category_products(
     cat = db.query(Category).filter(Category.slug == slug, Category.is_active == True).first()
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
-    if include_subcategories:
-        subq = db.query(Category.id).filter((Category.full_path == cat.full_path) | (Category.full_path.like(f"{cat.full_path}/%")))
-        q = q.filter((Product.category_id.in_(subq)) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id.in_(subq)))))
-    else:
-        q = q.filter((Product.category_id == cat.id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == cat.id))))
-    total = q.count()
-    items = q.order_by(Product.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    cat_ids = descendant_ids(cat.id) if include_subcategories else [cat.id]
+    # a UNION of two index lookups; OR-ing two IN subqueries defeats the planner
+    in_category = union(
+        select(Product.id).where(Product.category_id.in_(cat_ids)),
+        select(ProductCategory.product_id).where(ProductCategory.category_id.in_(cat_ids)),
+    )
+    q = q.filter(Product.id.in_(in_category))
+    q = q.with_entities(*PRODUCT_SUMMARY_COLUMNS)
+    keyset = PRODUCT_KEYSETS.get(sort or "created_at", PRODUCT_KEYSETS["created_at"])
+    items, total, next_cursor, estimated = paginate(q, keyset, page, limit, cursor, estimate=total_mode == "estimated")
+    return {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor, "total_estimated": estimated}
 
 # Admin endpoints
 admin_router = APIRouter(prefix="/admin/categories", tags=["admin-categories"])
@@ -107,6 +124,8 @@ def create_category(payload: CategoryCreate, db: Session = Depends(get_db_dep)):
         cat.parent = parent
     cat.set_slug_and_path()
     db.add(cat)
+    db.flush()
+    add_category(db, cat.id, parent.id if parent else None)
     db.commit()
     db.refresh(cat)
     return cat
@@ -129,15 +148,13 @@ def update_category(category_id: str, payload: CategoryUpdate, db: Session = Dep
         parent = db.query(Category).filter(Category.id == payload.parent_id).first() if payload.parent_id else None
         if payload.parent_id and not parent:
             raise HTTPException(status_code=400, detail="Parent category not found")
-        # prevent circular references: walk up the tree
-        cur = parent
-        while cur:
-            if cur.id == category_id:
-                raise HTTPException(status_code=400, detail="Circular category relationship not allowed")
-            cur = cur.parent
-        if parent and parent.level + 1 >= MAX_CATEGORY_DEPTH:
+        # prevent circular references: the new parent may not sit inside this subtree
+        if parent and is_descendant(db, parent.id, category_id):
+            raise HTTPException(status_code=400, detail="Circular category relationship not allowed")
+        if parent and parent.level + 1 + subtree_height(db, category_id) >= MAX_CATEGORY_DEPTH:
             raise HTTPException(status_code=400, detail="Max category depth exceeded")
         cat.parent = parent
+        move_category(db, category_id, parent.id if parent else None)
         parent_changed = True
     if payload.image_url is not None:
         cat.image_url = payload.image_url
@@ -154,6 +171,7 @@ def update_category(category_id: str, payload: CategoryUpdate, db: Session = Dep
         cat.slug = slugify(cat.name)
     if name_changed or parent_changed:
         cat.set_slug_and_path()
+        refresh_subtree_paths(db, cat)
     db.add(cat)
     db.commit()
     db.refresh(cat)
@@ -178,18 +196,12 @@ def admin_category_products(category_id: str, db: Session = Depends(get_db_dep))
     cat = db.query(Category).filter(Category.id == category_id).first()
     if not cat:
         raise HTTPException(status_code=404, detail="Category not found")
-    items = db.query(Product).filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id)))).order_by(Product.created_at.desc()).all()
+    items = db.query(Product).options(*PRODUCT_RELATIONS).filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id)))).order_by(Product.created_at.desc()).all()
     return {"items": items, "total": len(items)}
 
 @admin_router.post("/reorder", dependencies=[Depends(require_admin_role)])
 def reorder_categories(order: List[dict], db: Session = Depends(get_db_dep)):
-    ids = [o.get("id") for o in order]
-    cats = db.query(Category).filter(Category.id.in_(ids)).all()
-    for c in cats:
-        match = next((o for o in order if o.get("id") == c.id), None)
-        if match and isinstance(match.get("sort_order"), int):
-            c.sort_order = match["sort_order"]
-            db.add(c)
+    updated = apply_positions(db, Category, position_map(order))
     db.commit()
-    return {"message": "Reordered", "success": True}
+    return {"message": "Reordered", "success": True, "updated": updated}
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.api.deps import get_db_dep, optional_auth, get_current_active_user, require_admin_role
@@ -7,9 +7,12 @@ from app.models.cart_item import CartItem
 from app.models.order import Order, OrderItem, OrderStatus, PaymentStatus, FulfillmentStatus
 from app.services.order_service import generate_order_number, capture_item_snapshot, adjust_inventory_on_create, release_inventory_on_cancel, add_status_history
 from app.services.cart_service import cart_totals, estimate_shipping
+from app.utils.pagination import Keyset, paginate
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+ORDER_KEYSET = Keyset("created_at", [Order.created_at, Order.id])
+
 @router.post("", response_model=OrderResponse)
 async def create_order(payload: OrderCreate, request: Request, db: Session = Depends(get_db_dep), current_user=Depends(optional_auth)):
     user_id = current_user.id if current_user else None
@@ -112,11 +115,10 @@ async def create_order_from_cart(request: Request, db: Session = Depends(get_db_
     return order
 
 @router.get("", response_model=OrderListResponse)
-async def list_my_orders(db: Session = Depends(get_db_dep), current_user=Depends(get_current_active_user), page: int = 1, limit: int = 20):
+async def list_my_orders(db: Session = Depends(get_db_dep), current_user=Depends(get_current_active_user), page: int = 1, limit: int = 20, cursor: Optional[str] = None):
     q = db.query(Order).filter(Order.user_id == current_user.id)
-    total = q.count()
-    items = q.order_by(Order.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    items, total, next_cursor, _ = paginate(q, ORDER_KEYSET, page, limit, cursor)
+    return {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor}
 
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(order_id: str, db: Session = Depends(get_db_dep), current_user=Depends(optional_auth)):
@@ -144,13 +146,13 @@ async def cancel_order(order_id: str, payload: OrderCancellationRequest, db: Ses
 admin_router = APIRouter(prefix="/admin/orders", tags=["admin-orders"])
 
 @admin_router.get("", response_model=OrderListResponse, dependencies=[Depends(require_admin_role)])
-async def admin_list_orders(db: Session = Depends(get_db_dep), page: int = 1, limit: int = 20, status: Optional[str] = None):
+async def admin_list_orders(db: Session = Depends(get_db_dep), page: int = 1, limit: int = 20, status: Optional[str] = None, cursor: Optional[str] = None, total_mode: str = Query("exact", pattern="^(exact|estimated)$")):
     q = db.query(Order)
     if status:
         q = q.filter(Order.status == status)
-    total = q.count()
-    items = q.order_by(Order.created_at.desc()).offset((page - 1)*limit).limit(limit).all()
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    # order writes are not tagged for count_cache, so only the Postgres estimate is used
+    items, total, next_cursor, estimated = paginate(q, ORDER_KEYSET, page, limit, cursor, estimate=total_mode == "estimated", cached_count=False)
+    return {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor, "total_estimated": estimated}
 
 @admin_router.get("/{order_id}", response_model=OrderResponse, dependencies=[Depends(require_admin_role)])
 async def admin_get_order(order_id: str, db: Session = Depends(get_db_dep)):
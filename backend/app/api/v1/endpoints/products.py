@@ -1,27 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
+from sqlalchemy import literal, select, union_all
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import csv
 import io
 import uuid
 from app.api.deps import get_db_dep, optional_auth, require_admin_role
-from app.models.product import Product, ProductStatus
+from app.models.product import Product, ProductStatus, default_uuid
 from app.models.product_variant import ProductVariant
 from app.models.product_image import ProductImage, ImageType
 from app.models.category import Category
 from app.models.product_category import ProductCategory
 from app.schemas.product import (
-    ProductResponse, ProductListResponse, ProductSearchResponse, ProductCreate, ProductUpdate,
+    ProductResponse, ProductListResponse, ProductImportResult, ProductSummary, ProductSummaryListResponse, ProductSearchResponse, AutocompleteResponse, ProductCreate, ProductUpdate,
     ProductVariantCreate, ProductVariantUpdate, ProductVariantResponse, ProductInventoryUpdate, ProductStatusUpdate,
-    ProductImageCreate, ProductImageUpdate, ProductImageResponse
+    ProductImageCreate, ProductImageUpdate, ProductImageResponse, BulkStockUpdate, BulkStockUpdateResponse
 )
 from app.utils.helpers import slugify
-from app.utils.cache import products_cache, filters_cache, search_cache
+from app.utils.cache import details_cache, products_cache, search_cache
+from app.utils.http_cache import cached_json
+from app.utils.pagination import paginate
+from app.utils.ordering import apply_positions, position_map
+from app.core.config import settings
+from app.services.product_listing import PRODUCT_KEYSETS, PRODUCT_RELATIONS, PRODUCT_SUMMARY_COLUMNS
+from app.services.search_service import text_search, fuzzy_search
+from app.services.search_index import product_index, product_index_build
+from app.services.autocomplete import autocomplete_index, autocomplete_build, complete_from_db
+from app.services.recommendations import recommender
+from app.services.similarity import similar_index, similar_build
+from app.services.product_import import import_products
+from app.services.product_export import export_products
+from app.services.stock_sync import apply_stock_updates
+from app.services.image_pipeline import collect_media_garbage, store_product_image
+from app.services.facet_service import FACET_NAMES, product_facet_values, apply_facet_delta, read_facets, facet_counts, rebuild_facets
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-@router.get("", response_model=ProductListResponse)
+SUMMARY_LIST = TypeAdapter(List[ProductSummary])
+
+
+def _sync_indexes(p: Product):
+    # keep in-process search structures in line with a product write (replayed onto a build under way)
+    product_index_build.upsert(p)
+    autocomplete_build.upsert(p)
+    similar_build.upsert(p)
+
+@router.get("", response_model=ProductSummaryListResponse)
 def list_products(
+    request: Request,
     db: Session = Depends(get_db_dep),
     page: int = 1,
     limit: int = 20,
@@ -30,139 +58,214 @@ def list_products(
     is_featured: Optional[bool] = None,
     in_stock: Optional[bool] = None,
     sort: Optional[str] = None,
+    facets: Optional[str] = Query(None, description="Comma-separated facets to count: brand,tag,skin_type,hair_type,price"),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; replaces page"),
+    total_mode: str = Query("exact", pattern="^(exact|estimated)$", description="estimated: approximate total for large listings"),
 ):
     if page < 1:
         page = 1
-    cache_key = f"list:{page}:{limit}:{q}:{category_id}:{is_featured}:{in_stock}:{sort}"
-    cached = products_cache.get(cache_key)
-    if cached:
-        return cached
-    qset = db.query(Product).filter(Product.is_active == True, Product.status == ProductStatus.active)
-    if q:
-        like = f"%{q.lower()}%"
-        qset = qset.filter(Product.name.ilike(like) | Product.short_description.ilike(like) | Product.detailed_description.ilike(like))
-    if category_id:
-        # include products with primary category or via junction
-        qset = qset.filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id))))
-    if is_featured is not None:
-        qset = qset.filter(Product.is_featured == is_featured)
-    if in_stock is not None:
-        if in_stock:
-            qset = qset.filter(Product.inventory_quantity > 0)
-        else:
-            qset = qset.filter(Product.inventory_quantity <= 0)
-    total = qset.count()
-    if sort == "price_asc":
-        qset = qset.order_by(Product.base_price.asc())
-    elif sort == "price_desc":
-        qset = qset.order_by(Product.base_price.desc())
-    else:
-        qset = qset.order_by(Product.created_at.desc())
-    items = qset.offset((page - 1) * limit).limit(limit).all()
-    result = {"items": items, "total": total, "page": page, "limit": limit}
-    products_cache.set(cache_key, result)
-    return result
+    facet_names = [f.strip() for f in facets.split(",") if f.strip()] if facets else []
+    unknown = [f for f in facet_names if f not in FACET_NAMES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown facet(s): {', '.join(unknown)}")
+    cache_key = f"list:{page}:{limit}:{q}:{category_id}:{is_featured}:{in_stock}:{sort}:{','.join(facet_names)}:{cursor}:{total_mode}"
+    def build(db: Session):
+        qset = db.query(Product).filter(Product.is_active == True, Product.status == ProductStatus.active)
+        rank = None
+        if q:
+            qset, rank = text_search(qset, db, q)
+        if category_id:
+            # include products with primary category or via junction
+            qset = qset.filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id))))
+        if is_featured is not None:
+            qset = qset.filter(Product.is_featured == is_featured)
+        if in_stock is not None:
+            if in_stock:
+                qset = qset.filter(Product.inventory_quantity > 0)
+            else:
+                qset = qset.filter(Product.inventory_quantity <= 0)
+        facet_result = facet_counts(db, qset, facet_names) if facet_names else None
+        qset = qset.with_entities(*PRODUCT_SUMMARY_COLUMNS)
+        keyset = PRODUCT_KEYSETS.get(sort or "created_at", PRODUCT_KEYSETS["created_at"])
+        # relevance order has no stable keyset; cursor mode continues in created_at order
+        order_by = [rank.desc(), Product.created_at.desc()] if rank is not None and not sort else None
+        items, total, next_cursor, estimated = paginate(qset, keyset, page, limit, cursor, order_by, estimate=total_mode == "estimated")
+        result = {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor, "total_estimated": estimated, "facets": facet_result}
+        return ProductSummaryListResponse.model_validate(result).model_dump(mode="json")
+    return cached_json(request, products_cache, cache_key, build, db)
 
 @router.get("/search", response_model=ProductSearchResponse)
-def search_products(db: Session = Depends(get_db_dep), q: str = Query(...)):
-    key = f"search:{q}"
-    cached = search_cache.get(key)
-    if cached:
-        return cached
-    like = f"%{q.lower()}%"
-    items = db.query(Product).filter(
-        Product.is_active == True,
-        Product.status == ProductStatus.active,
-        (Product.name.ilike(like) | Product.short_description.ilike(like) | Product.detailed_description.ilike(like))
-    ).order_by(Product.created_at.desc()).limit(50).all()
-    # naive suggestions: top tags containing the token
-    token = q.lower().strip()
-    suggestions = []
-    if token:
-        tag_hits = db.query(Product.tags).filter(Product.tags.isnot(None)).limit(200).all()
-        pool = []
-        for (tags,) in tag_hits:
-            if isinstance(tags, list):
-                pool.extend(tags)
-        suggestions = list({t for t in pool if token in str(t).lower()})[:8]
-    result = {"items": items, "total": len(items), "suggestions": suggestions}
-    search_cache.set(key, result)
-    return result
+def search_products(
+    request: Request,
+    db: Session = Depends(get_db_dep),
+    q: str = Query(...),
+    fuzzy: bool = False,
+    threshold: float = Query(0.3, ge=0.1, le=1.0),
+):
+    if fuzzy and db.get_bind().dialect.name != "postgresql" and not product_index_build.usable:
+        # no trigram index in the database, so fuzzy matching needs the in-memory index;
+        # build it in the background and answer with exact full-text matching meanwhile
+        product_index_build.ensure()
+        fuzzy = False
+    key = f"search:{q}:{fuzzy}:{threshold if fuzzy else ''}"
+    def build(db: Session):
+        if product_index_build.usable:
+            # answer from the in-process index, then load only the matching rows; the status
+            # filter drops products deactivated by writers the index has not caught up with
+            hits = product_index.search(q, limit=50, fuzzy=fuzzy, threshold=threshold, max_candidates=settings.FUZZY_MAX_CANDIDATES)
+            ids = [pid for pid, _ in hits]
+            by_id = {p.id: p for p in db.query(Product).options(*PRODUCT_RELATIONS).filter(
+                Product.id.in_(ids), Product.is_active == True, Product.status == ProductStatus.active
+            ).all()} if ids else {}
+            items = [by_id[pid] for pid in ids if pid in by_id]
+        else:
+            qset = db.query(Product).options(*PRODUCT_RELATIONS).filter(Product.is_active == True, Product.status == ProductStatus.active)
+            if fuzzy and db.get_bind().dialect.name == "postgresql":
+                qset, rank = fuzzy_search(qset, db, q, threshold, settings.FUZZY_MAX_CANDIDATES)
+            else:
+                qset, rank = text_search(qset, db, q)
+            if rank is not None:
+                qset = qset.order_by(rank.desc(), Product.created_at.desc())
+            else:
+                qset = qset.order_by(Product.created_at.desc())
+            items = qset.limit(50).all()
+        token = q.lower().strip()
+        suggestions = []
+        if autocomplete_build.usable:
+            suggestions = [s["text"] for s in autocomplete_index.complete(q, limit=8)]
+        elif token:
+            # naive suggestions: top tags containing the token
+            tag_hits = db.query(Product.tags).filter(Product.tags.isnot(None)).limit(200).all()
+            pool = []
+            for (tags,) in tag_hits:
+                if isinstance(tags, list):
+                    pool.extend(tags)
+            suggestions = list({t for t in pool if token in str(t).lower()})[:8]
+        result = ProductSearchResponse.model_validate({"items": items, "total": len(items), "suggestions": suggestions})
+        return result.model_dump(mode="json")
+    return cached_json(request, search_cache, key, build, db)
+
+@router.get("/autocomplete", response_model=AutocompleteResponse)
+def autocomplete(
+    db: Session = Depends(get_db_dep),
+    q: str = Query(..., min_length=1),
+    limit: int = Query(8, ge=1, le=20),
+    types: Optional[List[str]] = Query(None, alias="type"),
+):
+    kinds = set(types) if types else None
+    if not autocomplete_build.usable:
+        # never scan the catalog on the request thread; answer from the database meanwhile
+        autocomplete_build.ensure()
+        return {"q": q, "suggestions": complete_from_db(db, q, limit=limit, kinds=kinds)}
+    return {"q": q, "suggestions": autocomplete_index.complete(q, limit=limit, kinds=kinds)}
 
 @router.get("/filter-options")
 def filter_options(db: Session = Depends(get_db_dep)):
-    cached = filters_cache.get("options")
-    if cached:
-        return cached
-    brands = [b[0] for b in db.query(Product.brand).filter(Product.brand.isnot(None)).distinct().all()]
-    tags_rows = db.query(Product.tags).filter(Product.tags.isnot(None)).all()
-    tags = set()
-    for (arr,) in tags_rows:
-        if isinstance(arr, list):
-            tags.update(arr)
-    result = {
-        "brands": sorted([b for b in brands if b]),
-        "tags": sorted(list(tags)),
-        "price_ranges": [
-            {"label": "Under 499", "min": 0, "max": 499},
-            {"label": "500 - 999", "min": 500, "max": 999},
-            {"label": "1000 - 1999", "min": 1000, "max": 1999},
-            {"label": "2000+", "min": 2000, "max": None},
-        ],
-    }
-    filters_cache.set("options", result)
-    return result
-
-@router.get("/featured", response_model=List[ProductResponse])
-def featured_products(db: Session = Depends(get_db_dep), category_id: Optional[str] = None):
-    qset = db.query(Product).filter(Product.is_active == True, Product.status == ProductStatus.active, Product.is_featured == True)
-    if category_id:
-        qset = qset.filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id))))
-    return qset.order_by(Product.created_at.desc()).limit(12).all()
+    return read_facets(db)
+
+@router.get("/featured", response_model=List[ProductSummary])
+def featured_products(request: Request, db: Session = Depends(get_db_dep), category_id: Optional[str] = None):
+    key = f"featured:{category_id}"
+    def build(db: Session):
+        qset = db.query(*PRODUCT_SUMMARY_COLUMNS).filter(Product.is_active == True, Product.status == ProductStatus.active, Product.is_featured == True)
+        if category_id:
+            qset = qset.filter((Product.category_id == category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == category_id))))
+        items = qset.order_by(Product.created_at.desc()).limit(12).all()
+        return SUMMARY_LIST.dump_python(SUMMARY_LIST.validate_python(items), mode="json")
+    return cached_json(request, products_cache, key, build, db)
 
 @router.get("/{slug}", response_model=ProductResponse)
-def product_by_slug(slug: str, db: Session = Depends(get_db_dep)):
-    p = db.query(Product).filter(Product.slug == slug, Product.is_active == True).first()
-    if not p:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return p
+def product_by_slug(slug: str, request: Request, db: Session = Depends(get_db_dep)):
+    key = f"product:{slug}"
+    def build(db: Session):
+        p = db.query(Product).options(*PRODUCT_RELATIONS).filter(Product.slug == slug, Product.is_active == True).first()
+        if not p:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ProductResponse.model_validate(p).model_dump(mode="json")
+    return cached_json(request, details_cache, key, build, db)
 
 @router.get("/{product_id}/variants", response_model=List[ProductVariantResponse])
 def product_variants(product_id: str, db: Session = Depends(get_db_dep)):
     return db.query(ProductVariant).filter(ProductVariant.product_id == product_id, ProductVariant.is_active == True).order_by(ProductVariant.sort_order).all()
 
-@router.get("/{product_id}/related", response_model=List[ProductResponse])
-def related_products(product_id: str, db: Session = Depends(get_db_dep)):
-    p = db.query(Product).filter(Product.id == product_id).first()
+@router.get("/{product_id}/related", response_model=List[ProductSummary])
+def related_products(
+    product_id: str,
+    db: Session = Depends(get_db_dep),
+    mode: str = Query("bought_together", pattern="^(bought_together|similar)$", description="similar: by tags, ingredients and skin/hair types"),
+):
+    p = db.query(Product.id, Product.category_id).filter(Product.id == product_id).first()
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
-    qset = db.query(Product).filter(Product.id != p.id, Product.is_active == True, Product.status == ProductStatus.active)
-    # by categories via junction or primary
-    if p.category_id:
-        qset = qset.filter((Product.category_id == p.category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == p.category_id))))
-    return qset.order_by(Product.total_sales.desc(), Product.created_at.desc()).limit(8).all()
+    limit = 8
+    active = db.query(*PRODUCT_SUMMARY_COLUMNS).filter(Product.is_active == True, Product.status == ProductStatus.active)
+    # over-fetch ids since some may be inactive now
+    if mode == "similar":
+        if similar_build.usable:
+            ids = similar_index.similar(p.id, limit=limit * 2)
+        else:
+            # built in the background; the same-category fill below answers meanwhile
+            similar_build.ensure()
+            ids = []
+    else:
+        recommender.request_sync(settings.RECOMMENDATIONS_SYNC_SECONDS)
+        ids = recommender.related(p.id, limit=limit * 2)
+    items = []
+    if ids:
+        by_id = {r.id: r for r in active.filter(Product.id.in_(ids)).all()}
+        items = [by_id[i] for i in ids if i in by_id][:limit]
+    if len(items) < limit:
+        # fill up with products from the same category (primary or via junction)
+        qset = active.filter(Product.id.notin_([p.id] + [r.id for r in items]))
+        if p.category_id:
+            qset = qset.filter((Product.category_id == p.category_id) | (Product.id.in_(db.query(ProductCategory.product_id).filter(ProductCategory.category_id == p.category_id))))
+        items += qset.order_by(Product.total_sales.desc(), Product.created_at.desc()).limit(limit - len(items)).all()
+    return items
 
 # Admin endpoints
 admin_router = APIRouter(prefix="/admin/products", tags=["admin-products"])
 
 @admin_router.get("", response_model=ProductListResponse, dependencies=[Depends(require_admin_role)])
-def admin_list_products(db: Session = Depends(get_db_dep), page: int = 1, limit: int = 20, q: Optional[str] = None):
+def admin_list_products(db: Session = Depends(get_db_dep), page: int = 1, limit: int = 20, q: Optional[str] = None, sort: Optional[str] = None, cursor: Optional[str] = None, total_mode: str = Query("exact", pattern="^(exact|estimated)$")):
     qset = db.query(Product)
     if q:
         like = f"%{q.lower()}%"
         qset = qset.filter(Product.name.ilike(like))
-    total = qset.count()
-    items = qset.order_by(Product.created_at.desc()).offset((page - 1)*limit).limit(limit).all()
-    return {"items": items, "total": total, "page": page, "limit": limit}
+    qset = qset.options(*PRODUCT_RELATIONS)
+    keyset = PRODUCT_KEYSETS.get(sort or "created_at", PRODUCT_KEYSETS["created_at"])
+    items, total, next_cursor, estimated = paginate(qset, keyset, page, limit, cursor, estimate=total_mode == "estimated")
+    return {"items": items, "total": total, "page": page, "limit": limit, "next_cursor": next_cursor, "total_estimated": estimated}
 
 @admin_router.post("", response_model=ProductResponse, dependencies=[Depends(require_admin_role)])
 def create_product(payload: ProductCreate, db: Session = Depends(get_db_dep)):
-    # Validation: non-negative inventory
+    # validate everything up front so nothing is written for a rejected payload
     if payload.inventory_quantity is not None and payload.inventory_quantity < 0:
         raise HTTPException(status_code=400, detail="Inventory cannot be negative")
+    variants = payload.variants or []
+    if any(v.inventory_quantity is not None and v.inventory_quantity < 0 for v in variants):
+        raise HTTPException(status_code=400, detail="Variant inventory cannot be negative")
+    if variants and not any(v.is_active for v in variants):
+        raise HTTPException(status_code=400, detail="At least one active variant is required")
+    variant_skus = [v.sku for v in variants if v.sku]
+    dupes = {sku for sku in variant_skus if variant_skus.count(sku) > 1}
+    if dupes:
+        raise HTTPException(status_code=400, detail=f"Variant SKU '{sorted(dupes)[0]}' is repeated")
+    # one round trip for all SKUs: the product's against products, its variants' against variants
+    checks = []
+    if payload.sku:
+        checks.append(select(Product.sku, literal("Product")).where(Product.sku == payload.sku))
+    if variant_skus:
+        checks.append(select(ProductVariant.sku, literal("Variant")).where(ProductVariant.sku.in_(variant_skus)))
+    if checks:
+        taken = db.execute(union_all(*checks).limit(1)).first()
+        if taken:
+            raise HTTPException(status_code=400, detail=f"{taken[1]} SKU '{taken[0]}' already exists")
+
     p = Product(
+        id=default_uuid(),
         name=payload.name,
         slug=slugify(payload.name),
+        sku=payload.sku,
         short_description=payload.short_description,
         detailed_description=payload.detailed_description,
         category_id=payload.category_id,
@@ -181,61 +284,71 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db_dep)):
         meta_title=payload.meta_title,
         meta_description=payload.meta_description,
     )
-    db.add(p)
-    db.commit()
-    db.refresh(p)
-    # product SKU uniqueness if provided
-    if payload.sku:
-        exists = db.query(Product).filter(Product.sku == payload.sku, Product.id != p.id).first()
-        if exists:
-            raise HTTPException(status_code=400, detail=f"Product SKU '{payload.sku}' already exists")
+    p.images = [
+        ProductImage(image_url=img.image_url, alt_text=img.alt_text, sort_order=img.sort_order or i)
+        for i, img in enumerate(payload.images or [])
+    ]
+    p.variants = [
+        ProductVariant(
+            title=v.title,
+            sku=v.sku,
+            price=v.price,
+            weight=v.weight,
+            size=v.size,
+            color=v.color,
+            scent=v.scent,
+            inventory_quantity=v.inventory_quantity,
+            is_active=v.is_active,
+            sort_order=i,
+        )
+        for i, v in enumerate(variants)
+    ]
     # multi-categories support via junction
-    categories = payload.categories or []
-    if payload.category_id and not any(c.id == payload.category_id for c in categories):
-        categories.append(type("_Tmp", (), {"id": payload.category_id, "is_primary": True}))
-    # persist
-    for c in categories:
-        db.add(ProductCategory(product_id=p.id, category_id=c.id, is_primary=getattr(c, "is_primary", False)))
+    categories = {c.id: c.is_primary for c in payload.categories or []}
+    if payload.category_id:
+        categories.setdefault(payload.category_id, True)
+    db.add(p)
+    db.add_all(ProductCategory(product_id=p.id, category_id=cid, is_primary=primary) for cid, primary in categories.items())
+    db.flush()  # one flush for the product and all child rows; column defaults are needed for the facets
+    apply_facet_delta(db, set(), product_facet_values(p))
     db.commit()
-    # images
-    if payload.images:
-        for (i, img) in enumerate(payload.images):
-            im = ProductImage(product_id=p.id, image_url=img.image_url, alt_text=img.alt_text, sort_order=img.sort_order or i)
-            db.add(im)
-        db.commit()
-    # variants
-    has_active_variant = False
-    if payload.variants:
-        for (i, v) in enumerate(payload.variants):
-            if v.inventory_quantity is not None and v.inventory_quantity < 0:
-                raise HTTPException(status_code=400, detail="Variant inventory cannot be negative")
-            # SKU uniqueness check
-            if v.sku:
-                exists = db.query(ProductVariant).filter(ProductVariant.sku == v.sku).first()
-                if exists:
-                    raise HTTPException(status_code=400, detail=f"Variant SKU '{v.sku}' already exists")
-            var = ProductVariant(
-                product_id=p.id,
-                title=v.title,
-                sku=v.sku,
-                price=v.price,
-                weight=v.weight,
-                size=v.size,
-                color=v.color,
-                scent=v.scent,
-                inventory_quantity=v.inventory_quantity,
-                is_active=v.is_active,
-                sort_order=i,
-            )
-            has_active_variant = has_active_variant or bool(v.is_active)
-            db.add(var)
-        db.commit()
-    # business rule: at least one active variant if variants provided
-    if payload.variants and not has_active_variant:
-        raise HTTPException(status_code=400, detail="At least one active variant is required")
     db.refresh(p)
+    _sync_indexes(p)
     return p
 
+@admin_router.post("/import", response_model=ProductImportResult, dependencies=[Depends(require_admin_role)])
+def bulk_import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults from the file extension"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db_dep),
+):
+    fmt = format or ("ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv")
+    return import_products(db, file.file, fmt, batch_size, on_commit=lambda products: [_sync_indexes(p) for p in products])
+
+@admin_router.get("/export", dependencies=[Depends(require_admin_role)])
+def export_catalog(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    status: Optional[ProductStatus] = None,
+    gzip: bool = False,
+    batch_size: int = Query(1000, ge=100, le=10000),
+):
+    # gzip is delivered as a .gz file rather than Content-Encoding so clients keep it compressed on disk
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    filename = f"products.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    body = export_products(format, status.value if status else None, compress=gzip, batch_size=batch_size)
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+@admin_router.post("/stock", response_model=BulkStockUpdateResponse, dependencies=[Depends(require_admin_role)])
+def bulk_update_stock(payload: BulkStockUpdate, db: Session = Depends(get_db_dep)):
+    return apply_stock_updates(db, payload.items)
+
+@admin_router.post("/facets/rebuild", dependencies=[Depends(require_admin_role)])
+def rebuild_facet_counts(db: Session = Depends(get_db_dep)):
+    # recount filter options from the catalog, e.g. after bulk SQL edits
+    return {"values": rebuild_facets(db)}
+
 @admin_router.put("/{product_id}", response_model=ProductResponse, dependencies=[Depends(require_admin_role)])
 def update_product(product_id: str, payload: ProductUpdate, db: Session = Depends(get_db_dep)):
     p = db.query(Product).filter(Product.id == product_id).first()
@@ -244,13 +357,16 @@ def update_product(product_id: str, payload: ProductUpdate, db: Session = Depend
     data = payload.dict(exclude_unset=True)
     if "inventory_quantity" in data and data["inventory_quantity"] is not None and data["inventory_quantity"] < 0:
         raise HTTPException(status_code=400, detail="Inventory cannot be negative")
+    before = product_facet_values(p)
     for k, v in data.items():
         setattr(p, k, v)
     if "name" in data:
         p.slug = slugify(p.name)
+    apply_facet_delta(db, before, product_facet_values(p))
     db.add(p)
     db.commit()
     db.refresh(p)
+    _sync_indexes(p)
     return p
 
 @admin_router.delete("/{product_id}", dependencies=[Depends(require_admin_role)])
@@ -259,9 +375,12 @@ def delete_product(product_id: str, db: Session = Depends(get_db_dep)):
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
     # soft delete
+    before = product_facet_values(p)
     p.is_active = False
+    apply_facet_delta(db, before, product_facet_values(p))
     db.add(p)
     db.commit()
+    _sync_indexes(p)
     return {"message": "Product deleted", "success": True}
 
 @admin_router.put("/{product_id}/status", dependencies=[Depends(require_admin_role)])
@@ -269,10 +388,13 @@ def update_status(product_id: str, payload: ProductStatusUpdate, db: Session = D
     p = db.query(Product).filter(Product.id == product_id).first()
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
+    before = product_facet_values(p)
     p.is_active = payload.is_active
     p.status = payload.status
+    apply_facet_delta(db, before, product_facet_values(p))
     db.add(p)
     db.commit()
+    _sync_indexes(p)
     return {"message": "Status updated", "success": True}
 
 @admin_router.put("/{product_id}/inventory", dependencies=[Depends(require_admin_role)])
@@ -300,6 +422,19 @@ def add_image(product_id: str, payload: ProductImageCreate, db: Session = Depend
     db.refresh(img)
     return img
 
+@admin_router.post("/{product_id}/images/upload", response_model=ProductImageResponse, dependencies=[Depends(require_admin_role)])
+def upload_image(
+    product_id: str,
+    file: UploadFile = File(...),
+    alt_text: Optional[str] = Form(None),
+    sort_order: int = Form(0),
+    db: Session = Depends(get_db_dep),
+):
+    if not db.query(Product.id).filter(Product.id == product_id).first():
+        raise HTTPException(status_code=404, detail="Product not found")
+    # derivatives are produced in the background; the response carries the original's size
+    return store_product_image(db, product_id, file, alt_text, sort_order)
+
 @admin_router.put("/images/{image_id}", response_model=ProductImageResponse, dependencies=[Depends(require_admin_role)])
 def update_image(image_id: str, payload: ProductImageUpdate, db: Session = Depends(get_db_dep)):
     img = db.query(ProductImage).filter(ProductImage.id == image_id).first()
@@ -320,19 +455,24 @@ def delete_image(image_id: str, db: Session = Depends(get_db_dep)):
         raise HTTPException(status_code=404, detail="Image not found")
     db.delete(img)
     db.commit()
+    # stored files can back other rows too; the periodic media sweep removes them once unreferenced
     return {"message": "Image deleted", "success": True}
 
+@admin_router.post("/images/gc", dependencies=[Depends(require_admin_role)])
+def sweep_media():
+    return {"removed": collect_media_garbage()}
+
 @admin_router.post("/images/reorder", dependencies=[Depends(require_admin_role)])
 def reorder_images(order: List[dict], db: Session = Depends(get_db_dep)):
-    ids = [o.get("id") for o in order]
-    imgs = db.query(ProductImage).filter(ProductImage.id.in_(ids)).all()
-    for im in imgs:
-        match = next((o for o in order if o.get("id") == im.id), None)
-        if match and isinstance(match.get("sort_order"), int):
-            im.sort_order = match["sort_order"]
-            db.add(im)
+    updated = apply_positions(db, ProductImage, position_map(order))
+    db.commit()
+    return {"message": "Reordered", "success": True, "updated": updated}
+
+@admin_router.post("/variants/reorder", dependencies=[Depends(require_admin_role)])
+def reorder_variants(order: List[dict], db: Session = Depends(get_db_dep)):
+    updated = apply_positions(db, ProductVariant, position_map(order))
     db.commit()
-    return {"message": "Reordered", "success": True}
+    return {"message": "Reordered", "success": True, "updated": updated}
 
 @admin_router.post("/{product_id}/variants", response_model=ProductVariantResponse, dependencies=[Depends(require_admin_role)])
 def add_variant(product_id: str, payload: ProductVariantCreate, db: Session = Depends(get_db_dep)):
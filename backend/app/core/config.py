@@ -34,6 +34,12 @@ class Settings(BaseSettings):
     ALLOWED_IMAGE_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png", ".webp"]
     STATIC_FILES_URL: str = "/static"
     STATIC_FILES_PATH: str = "./app/uploads"
+    # worker processes resizing uploaded product images
+    IMAGE_WORKERS: int = 2
+    # media files no row references are removed by a periodic sweep (0 disables it); files
+    # written within the grace period are kept so uploads that have not committed yet survive
+    MEDIA_GC_INTERVAL_SECONDS: int = 6 * 3600
+    MEDIA_GC_GRACE_SECONDS: int = 3600
 
     RAZORPAY_KEY_ID: str | None = None
     RAZORPAY_KEY_SECRET: str | None = None
@@ -46,9 +52,25 @@ class Settings(BaseSettings):
     FROM_EMAIL: str | None = None
 
     REDIS_URL: str | None = None
+    # expired catalog cache entries are served this long while one request refreshes them
+    CACHE_STALE_SECONDS: int = 300
+    # per-process (L1) copies live this long; bounds how stale a worker that missed an
+    # invalidation, e.g. during a Redis outage, can be
+    CACHE_L1_SECONDS: int = 30
+    # coalesce cache misses across workers with a Redis lock (when REDIS_URL is set)
+    CACHE_DISTRIBUTED_LOCK: bool = True
+
+    SEARCH_INDEX_ENABLED: bool = True
+    FUZZY_MAX_CANDIDATES: int = 2000
+    # how often /products/{id}/related folds newly placed orders into the co-purchase model
+    RECOMMENDATIONS_SYNC_SECONDS: int = 60
+    # lower edges of the price facet buckets (first bucket starts at 0)
+    PRICE_BUCKET_EDGES: List[int] = [500, 1000, 2000]
 
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
+    # total_mode=estimated: planner estimates below this fall back to an exact count
+    ESTIMATED_COUNT_MIN_ROWS: int = 10000
 
     BCRYPT_ROUNDS: int = 12
 
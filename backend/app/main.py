@@ -1,7 +1,17 @@
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.utils.media_files import MediaFiles
+from app.services.search_index import product_index_build
+from app.services.autocomplete import autocomplete_build
+from app.services.facet_service import ensure_facets
+from app.services.category_tree import ensure_category_closure
+from app.services.recommendations import build_recommendations
+from app.services.similarity import similar_build
+from app.services.image_pipeline import shutdown_image_workers, start_media_gc
+from app.services import cache_invalidation  # noqa: registers session listeners
 
 from app.api.v1.api import api_router
 
@@ -16,12 +26,35 @@ app.add_middleware(
     allow_headers=settings.ALLOWED_HEADERS,
 )
 
-# Static files (uploads)
-app.mount(settings.STATIC_FILES_URL, StaticFiles(directory=settings.STATIC_FILES_PATH), name="static")
+# Static files (uploads); content-addressed media/ is served as immutable
+app.mount(settings.STATIC_FILES_URL, MediaFiles(directory=settings.STATIC_FILES_PATH), name="static")
 
 # Routers
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def build_search_indexes():
+    # nothing here may hold up serving: the in-process indexes build on their own threads and
+    # requests use the database until they are ready; the rest is checked on one more thread
+    if settings.SEARCH_INDEX_ENABLED:
+        for build in (product_index_build, autocomplete_build, similar_build):
+            build.request()
+    threading.Thread(target=_prepare_catalog, name="prepare-catalog", daemon=True).start()
+    start_media_gc()
+
+def _prepare_catalog():
+    db = SessionLocal()
+    try:
+        ensure_facets(db)
+        ensure_category_closure(db)
+        build_recommendations(db)
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def stop_image_workers():
+    shutdown_image_workers()
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "app": settings.APP_NAME, "version": settings.APP_VERSION}
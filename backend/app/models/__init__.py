@@ -6,10 +6,13 @@ from .user import User  # noqa
 from .address import Address  # noqa
 from .refresh_token import RefreshToken  # noqa
 from .category import Category  # noqa
+from .category_closure import CategoryClosure  # noqa
 from .product import Product  # noqa
 from .product_image import ProductImage  # noqa
 from .product_variant import ProductVariant  # noqa
 from .product_category import ProductCategory  # noqa
+from .product_facet import ProductFacet  # noqa
+from . import product_search  # noqa
 
 __all_models_metadata__: list[MetaData] = [Base.metadata]
 
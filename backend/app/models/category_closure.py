@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
+from app.core.database import Base
+
+class CategoryClosure(Base):
+    """Every ancestor/descendant pair of the category tree, including (c, c) at depth 0 (see app.services.category_tree)."""
+    __tablename__ = "category_closure"
+    __table_args__ = (
+        Index("ix_category_closure_descendant", "descendant_id", "ancestor_id"),
+    )
+
+    ancestor_id = Column(String(36), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(String(36), ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Numeric, Text, Enum
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Numeric, Text, Enum, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -39,6 +39,12 @@ class OrderSource(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # keyset pagination for customer and admin order listings
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=default_uuid, index=True)
     order_number = Column(String(32), unique=True, index=True, nullable=False)
@@ -112,5 +118,5 @@ class OrderStatusHistory(Base):
     changed_by = Column(String(36), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     reason = Column(Text, nullable=True)
     notes = Column(Text, nullable=True)
-    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # recommendations re-check recent changes
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, Text, Numeric, Enum
+from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, Text, Numeric, Enum, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,6 +18,12 @@ class ProductStatus(str, enum.Enum):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # keyset pagination: one per listing sort, id as tiebreaker
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_base_price_id", "base_price", "id"),
+        Index("ix_products_total_sales_id", "total_sales", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=default_uuid, index=True)
     name = Column(String(255), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -6,6 +6,8 @@ class ProductCategory(Base):
     __tablename__ = "product_categories"
     __table_args__ = (
         UniqueConstraint('product_id', 'category_id', name='uq_product_category'),
+        # category listings look links up by category; the primary key leads with product_id
+        Index('ix_product_categories_category_id', 'category_id', 'product_id'),
     )
 
     product_id = Column(String(36), ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ProductFacet(Base):
+    """Materialized facet value counts over active products (see app.services.facet_service)."""
+    __tablename__ = "product_facets"
+
+    facet = Column(String(32), primary_key=True)
+    value = Column(String(255), primary_key=True)
+    product_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
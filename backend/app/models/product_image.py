@@ -1,4 +1,5 @@
 from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Boolean, Enum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.core.database import Base
 from uuid import uuid4
@@ -27,6 +28,8 @@ class ProductImage(Base):
     width = Column(Integer, nullable=True)
     height = Column(Integer, nullable=True)
     file_size = Column(Integer, nullable=True)
+    # resized copies of uploaded images: name -> {width, height, formats: {ext: {url, size}}}
+    derivatives = Column(JSONB, nullable=True)
     is_primary = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -0,0 +1,69 @@
+from sqlalchemy import DDL, event
+from app.core.database import Base
+
+# Full-text search schema for products.
+# Postgres: generated, weighted tsvector column + GIN index (maintained by the database),
+# plus a pg_trgm GIN index for fuzzy matching.
+# SQLite: FTS5 table holding products.id as an unindexed column, kept in sync by triggers.
+# Statements are idempotent so every create_all() also upgrades existing databases.
+
+# expression shared by the trigram index and fuzzy queries; must match exactly for the index to be used
+FUZZY_DOC_SQL = "lower(coalesce(name, '') || ' ' || coalesce(brand, '') || ' ' || coalesce(ingredients, ''))"
+
+PG_SEARCH_DDL = [
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(short_description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(detailed_description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)",
+    # typo-tolerant matching: trigram index over the fields shoppers misspell most
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_products_fuzzy_trgm ON products USING gin (({FUZZY_DOC_SQL}) gin_trgm_ops)",
+]
+
+_FTS_COLS = "name, short_description, detailed_description"
+
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS products_search_fts USING fts5({_FTS_COLS}, product_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_search_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_search_fts({_FTS_COLS}, product_id) VALUES (new.name, new.short_description, new.detailed_description, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_search_fts_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_search_fts WHERE product_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_search_fts_au AFTER UPDATE OF {_FTS_COLS}, id ON products BEGIN
+        DELETE FROM products_search_fts WHERE product_id = old.id;
+        INSERT INTO products_search_fts({_FTS_COLS}, product_id) VALUES (new.name, new.short_description, new.detailed_description, new.id);
+    END
+    """,
+]
+
+# rows written before the table existed; once it does, the triggers keep it complete
+SQLITE_SEARCH_BACKFILL = f"""
+    INSERT INTO products_search_fts({_FTS_COLS}, product_id)
+    SELECT name, short_description, detailed_description, id FROM products
+"""
+
+for stmt in PG_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(stmt).execute_if(dialect="postgresql"))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_sqlite_search(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    created = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_search_fts'"
+    ).first() is None
+    for stmt in SQLITE_SEARCH_DDL:
+        connection.exec_driver_sql(stmt)
+    if created:
+        connection.exec_driver_sql(SQLITE_SEARCH_BACKFILL)
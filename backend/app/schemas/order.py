@@ -90,4 +90,6 @@ class OrderListResponse(BaseModel):
     total: int
     page: int
     limit: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
 
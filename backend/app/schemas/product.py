@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
 from datetime import datetime
 from app.models.product import ProductStatus
@@ -21,6 +21,7 @@ class ProductImageResponse(ProductImageBase):
     width: Optional[int] = None
     height: Optional[int] = None
     file_size: Optional[int] = None
+    derivatives: Optional[dict] = None  # filled in once an uploaded image has been resized
 
     class Config:
         from_attributes = True
@@ -120,17 +121,98 @@ class ProductResponse(ProductBase):
     class Config:
         from_attributes = True
 
+class ProductSummary(BaseModel):
+    """Grid/card projection of a product; full detail is served by product_by_slug."""
+    id: str
+    name: str
+    slug: str
+    brand: Optional[str] = None
+    base_price: float
+    compare_price: Optional[float] = None
+    primary_image: Optional[str] = None
+    primary_image_derivatives: Optional[dict] = None
+    average_rating: float | None = None
+    total_reviews: int = 0
+    inventory_quantity: int = 0
+    in_stock: bool = True
+
+    class Config:
+        from_attributes = True
+
+class FacetCount(BaseModel):
+    value: Any
+    count: int
+
 class ProductListResponse(BaseModel):
     items: List[ProductResponse]
     total: int
     page: int
     limit: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
+    facets: Optional[dict[str, List[FacetCount]]] = None
+
+class ProductSummaryListResponse(BaseModel):
+    items: List[ProductSummary]
+    total: int
+    page: int
+    limit: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
+    facets: Optional[dict[str, List[FacetCount]]] = None
+
+class ProductImportError(BaseModel):
+    row: int
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportResult(BaseModel):
+    rows: int
+    created: int
+    failed: int
+    seconds: float
+    rows_per_second: Optional[float] = None
+    errors: List[ProductImportError] = []
+    errors_truncated: bool = False
+
+class StockUpdateItem(BaseModel):
+    sku: str
+    inventory_quantity: Optional[int] = None
+    price: Optional[float] = None  # base_price for a product SKU, price for a variant SKU
+    compare_price: Optional[float] = None
+
+class BulkStockUpdate(BaseModel):
+    items: List[StockUpdateItem] = Field(..., min_length=1, max_length=20000)
+
+class StockUpdateResult(BaseModel):
+    sku: str
+    status: str  # updated | unchanged | not_found | invalid
+    kind: Optional[str] = None  # product | variant
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkStockUpdateResponse(BaseModel):
+    received: int
+    updated: int
+    unchanged: int
+    not_found: int
+    invalid: int
+    results: List[StockUpdateResult]
 
 class ProductSearchResponse(BaseModel):
     items: List[ProductResponse]
     total: int
     suggestions: Optional[List[str]] = None
 
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    type: str
+    score: int
+
+class AutocompleteResponse(BaseModel):
+    q: str
+    suggestions: List[AutocompleteSuggestion]
+
 class ProductInventoryUpdate(BaseModel):
     inventory_quantity: int
     low_stock_threshold: Optional[int] = None
@@ -0,0 +1,220 @@
+import bisect
+import heapq
+import logging
+import threading
+from typing import Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from app.models.product import Product, ProductStatus
+from app.services.search_index import is_searchable
+from app.services.search_service import tokenize
+from app.services.index_refresh import IndexBuild, SwappableIndex, refresh_on_remote_writes
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("product", "brand", "tag")
+MAX_SUGGESTIONS = 20
+# bound on memoized prefixes; the memo is dropped wholesale when it grows past this
+MAX_CACHED_PREFIXES = 50_000
+
+
+class _Entry:
+    __slots__ = ("text", "norm", "kind", "weights", "score")
+
+    def __init__(self, text: str, norm: str, kind: str):
+        self.text = text
+        self.norm = norm
+        self.kind = kind
+        self.weights: dict[str, int] = {}  # product_id -> weight
+        self.score = 0
+
+    def rank_key(self):
+        return (-self.score, self.text)
+
+
+def _normalize(s: str) -> str:
+    return " ".join(tokenize(s))
+
+
+def _word_suffixes(norm: str) -> list[str]:
+    words = norm.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _prefixes(norm: str) -> set[str]:
+    return {suffix[:n] for suffix in _word_suffixes(norm) for n in range(1, len(suffix) + 1)}
+
+
+def product_phrases(product: Product) -> dict[tuple[str, str], str]:
+    raw = [(product.name, "product"), (product.brand, "brand")]
+    raw += [(t, "tag") for t in (product.tags or []) if isinstance(t, str)]
+    out = {}
+    for text, kind in raw:
+        norm = _normalize(text or "")
+        if norm:
+            out.setdefault((norm, kind), text.strip())
+    return out
+
+
+class AutocompleteIndex(SwappableIndex):
+    """Sorted-array prefix index over product names, brands and tags.
+
+    Every phrase is reachable from the start of each of its words ("hair oil" completes
+    "Ashwagandha Hair Oil"). Suggestions are ranked by the summed total_sales of the
+    products carrying the phrase. The top suggestions of every prefix seen are memoized
+    and patched in place on writes, so repeated keystrokes never rescan the key range.
+    """
+
+    def __init__(self):
+        self.entries: dict[tuple[str, str], _Entry] = {}
+        self.keys: list[tuple[str, str, str]] = []  # sorted (word suffix, normalized phrase, kind)
+        self.by_product: dict[str, dict[tuple[str, str], int]] = {}
+        self.ready = False
+        self._top: dict[tuple[str, str], list[_Entry]] = {}  # (prefix, kind) -> best entries
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.by_product)
+
+    def _products(self, db: Session, batch_size: int):
+        cols = [Product.name, Product.brand, Product.tags, Product.total_sales, Product.is_active, Product.status]
+        return (
+            db.query(Product)
+            .options(load_only(*cols))
+            .filter(Product.is_active == True, Product.status == ProductStatus.active)
+            .yield_per(batch_size)
+        )
+
+    def build_from(self, products: Iterable[Product]) -> int:
+        with self._lock:
+            self.entries, self.keys, self.by_product, self._top = {}, [], {}, {}
+            for p in products:
+                self._apply(p.id, self._phrases(p), bulk=True)
+            self.keys.sort()
+            self.ready = True
+            return len(self.by_product)
+
+    def upsert(self, product: Product):
+        phrases = self._phrases(product) if is_searchable(product) else {}
+        with self._lock:
+            self._apply(product.id, phrases)
+
+    def remove(self, product_id: str):
+        with self._lock:
+            self._apply(product_id, {})
+
+    @staticmethod
+    def _phrases(product: Product) -> dict[tuple[str, str], tuple[str, int]]:
+        weight = int(product.total_sales or 0) + 1
+        return {ref: (text, weight) for ref, text in product_phrases(product).items()}
+
+    def _apply(self, product_id: str, phrases: dict, bulk: bool = False):
+        old = self.by_product.pop(product_id, {})
+        for ref in old.keys() - phrases.keys():
+            self._set_weight(self.entries[ref], product_id, None, bulk)
+        for ref, (text, weight) in phrases.items():
+            entry = self.entries.get(ref)
+            if entry is None:
+                entry = self.entries[ref] = _Entry(text, ref[0], ref[1])
+                for suffix in _word_suffixes(ref[0]):
+                    key = (suffix, ref[0], ref[1])
+                    if bulk:
+                        self.keys.append(key)
+                    else:
+                        bisect.insort(self.keys, key)
+            self._set_weight(entry, product_id, weight, bulk)
+        if phrases:
+            self.by_product[product_id] = {ref: w for ref, (_, w) in phrases.items()}
+
+    def _set_weight(self, entry: _Entry, product_id: str, weight: Optional[int], bulk: bool):
+        prev = entry.weights.pop(product_id, 0)
+        if weight is not None:
+            entry.weights[product_id] = weight
+        entry.score += (weight or 0) - prev
+        if bulk:
+            return
+        if not entry.weights:
+            del self.entries[(entry.norm, entry.kind)]
+            for suffix in _word_suffixes(entry.norm):
+                key = (suffix, entry.norm, entry.kind)
+                i = bisect.bisect_left(self.keys, key)
+                if i < len(self.keys) and self.keys[i] == key:
+                    self.keys.pop(i)
+        self._patch_top(entry, dropped=(weight or 0) < prev or not entry.weights)
+
+    def _patch_top(self, entry: _Entry, dropped: bool):
+        if not self._top:
+            return
+        for prefix in _prefixes(entry.norm):
+            top = self._top.get((prefix, entry.kind))
+            if top is None:
+                continue
+            if dropped:
+                if entry in top:
+                    # a better replacement may sit outside the cached slice; recompute lazily
+                    del self._top[(prefix, entry.kind)]
+                continue
+            if entry in top:
+                top.sort(key=_Entry.rank_key)
+            elif len(top) < MAX_SUGGESTIONS or entry.rank_key() < top[-1].rank_key():
+                bisect.insort(top, entry, key=_Entry.rank_key)
+                del top[MAX_SUGGESTIONS:]
+
+    def _scan(self, prefix: str, kind: str, limit: int) -> list[_Entry]:
+        i = bisect.bisect_left(self.keys, (prefix,))
+        hits: dict[tuple[str, str], _Entry] = {}
+        while i < len(self.keys) and self.keys[i][0].startswith(prefix):
+            _, norm, k = self.keys[i]
+            if k == kind:
+                hits.setdefault((norm, k), self.entries[(norm, k)])
+            i += 1
+        return heapq.nsmallest(limit, hits.values(), key=_Entry.rank_key)
+
+    def _best(self, prefix: str, kind: str, limit: int) -> list[_Entry]:
+        top = self._top.get((prefix, kind))
+        if top is None:
+            if len(self._top) >= MAX_CACHED_PREFIXES:
+                self._top.clear()
+            top = self._top[(prefix, kind)] = self._scan(prefix, kind, MAX_SUGGESTIONS)
+        return top[:limit]
+
+    def complete(self, q: str, limit: int = 8, kinds: Optional[set[str]] = None) -> List[dict]:
+        prefix = _normalize(q)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        with self._lock:
+            per_kind = [self._best(prefix, k, limit) for k in KINDS if not kinds or k in kinds]
+            top = list(heapq.merge(*per_kind, key=_Entry.rank_key))[:limit]
+            return [{"text": e.text, "type": e.kind, "score": e.score} for e in top]
+
+
+autocomplete_index = AutocompleteIndex()
+autocomplete_build = IndexBuild("autocomplete", autocomplete_index)
+refresh_on_remote_writes(autocomplete_build)
+
+
+def complete_from_db(db: Session, q: str, limit: int = 8, kinds: Optional[set[str]] = None) -> List[dict]:
+    """Product names and brands starting with q, ranked like the index; used while it is built."""
+    prefix = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if not prefix:
+        return []
+    like = f"{prefix}%"
+    active = (Product.is_active == True, Product.status == ProductStatus.active)
+    weight = func.coalesce(Product.total_sales, 0) + 1
+    out = []
+    if not kinds or "product" in kinds:
+        rows = (
+            db.query(Product.name, weight).filter(*active, Product.name.ilike(like, escape="\\"))
+            .order_by(weight.desc(), Product.name).limit(limit)
+        )
+        out += [{"text": name, "type": "product", "score": int(score)} for name, score in rows]
+    if not kinds or "brand" in kinds:
+        score = func.sum(weight)
+        rows = (
+            db.query(Product.brand, score).filter(*active, Product.brand.ilike(like, escape="\\"))
+            .group_by(Product.brand).order_by(score.desc(), Product.brand).limit(limit)
+        )
+        out += [{"text": brand, "type": "brand", "score": int(s)} for brand, s in rows]
+    out.sort(key=lambda s: (-s["score"], s["text"]))
+    return out[:limit]
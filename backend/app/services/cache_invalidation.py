@@ -0,0 +1,123 @@
+from typing import Iterable, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.category import Category
+from app.models.category_closure import CategoryClosure
+from app.models.product import Product
+from app.models.product_category import ProductCategory
+from app.models.product_image import ProductImage
+from app.models.product_variant import ProductVariant
+from app.utils.cache import invalidate
+
+# model -> cache namespaces whose entries can embed its rows
+CATALOG_TAGS = {
+    Product: ("products", "details", "search", "filters", "counts"),
+    ProductVariant: ("details", "search"),
+    ProductImage: ("products", "details", "search"),
+    ProductCategory: ("products", "counts"),
+    Category: ("products", "tree", "counts"),
+    CategoryClosure: ("products", "counts"),
+}
+_TABLE_TAGS = {m.__table__.name: tags for m, tags in CATALOG_TAGS.items()}
+
+# Checkouts and cancellations only move stock. Exact quantities are shown on the product page
+# (and checked live at checkout), so such writes drop just the "details" namespace; listings and
+# search results are dropped as well only when a row goes in or out of stock.
+STOCK_COLUMNS = {"inventory_quantity", "low_stock_threshold", "updated_at"}
+STOCK_TAGS = ("details",)
+AVAILABILITY_TAGS = {
+    Product: ("products", "details", "search", "counts"),
+    ProductVariant: ("details", "search"),
+}
+
+
+def _in_stock(obj, quantity) -> bool:
+    if isinstance(obj, Product):
+        return not obj.track_inventory or (quantity or 0) > 0
+    return quantity is None or quantity > 0
+
+
+def _stock_tags(obj):
+    """Tags for an update that touched only stock columns, or None for any other change."""
+    if type(obj) not in AVAILABILITY_TAGS:
+        return None
+    attrs = inspect(obj).attrs
+    changed = {a.key for a in attrs if a.history.has_changes()}
+    if not changed or not changed <= STOCK_COLUMNS:
+        return None
+    history = attrs.inventory_quantity.history
+    if not history.deleted or not history.added:
+        return AVAILABILITY_TAGS[type(obj)]  # previous value unknown: assume it flipped
+    if _in_stock(obj, history.deleted[0]) != _in_stock(obj, history.added[0]):
+        return AVAILABILITY_TAGS[type(obj)]
+    return STOCK_TAGS
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault("cache_tags", set())
+
+
+def _note_products(session: Session, ids: Optional[Iterable[str]]):
+    """Record written product ids, published with the invalidation so other workers can patch
+    their search indexes in place; None (a bulk write we cannot enumerate) sticks for the transaction."""
+    if ids is None:
+        session.info["cache_product_ids"] = None
+        return
+    written = session.info.setdefault("cache_product_ids", set())
+    if written is not None:
+        written.update(ids)
+
+
+def _bulk_ids(state) -> Optional[list]:
+    # executemany by primary key (imports, stock sync) names its rows; WHERE-driven statements do not
+    params = state.parameters
+    if isinstance(params, dict):
+        params = [params]
+    if state.is_delete or not params or not all(isinstance(p, dict) and p.get("id") for p in params):
+        return None
+    return [p["id"] for p in params]
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session: Session, flush_context):
+    # covers admin edits, imports and order inventory changes alike
+    tags = _pending(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        model_tags = CATALOG_TAGS.get(type(obj))
+        if not model_tags:
+            continue
+        if obj in session.dirty and obj not in session.deleted:
+            if not session.is_modified(obj):
+                continue
+            model_tags = _stock_tags(obj) or model_tags
+        tags.update(model_tags)
+        if isinstance(obj, Product):
+            _note_products(session, (obj.id,))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(state):
+    # bulk insert(Model) and query.update()/delete() bypass the flush; old values are not known
+    # here, so even stock-only bulk updates drop every namespace the model feeds
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        tags = _TABLE_TAGS.get(getattr(table, "name", None))
+        if tags:
+            _pending(state.session).update(tags)
+            if table.name == Product.__tablename__:
+                _note_products(state.session, _bulk_ids(state))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    tags = session.info.pop("cache_tags", None)
+    ids = session.info.pop("cache_product_ids", set())
+    if tags:
+        invalidate(*tags, ids=ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("cache_tags", None)
+        session.info.pop("cache_product_ids", None)
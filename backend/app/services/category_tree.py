@@ -0,0 +1,105 @@
+import logging
+from typing import Optional
+from sqlalchemy import and_, delete, func, insert, literal, select, true
+from sqlalchemy.orm import Session, aliased
+from app.models.category import Category
+from app.models.category_closure import CategoryClosure
+from app.utils.helpers import calc_category_path
+
+logger = logging.getLogger(__name__)
+
+
+def descendant_ids(category_id: str):
+    """Subquery of the category and everything below it; one primary-key range scan."""
+    return select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+
+
+def is_descendant(db: Session, category_id: str, of_id: str) -> bool:
+    return db.query(CategoryClosure.depth).filter(
+        CategoryClosure.ancestor_id == of_id, CategoryClosure.descendant_id == category_id
+    ).first() is not None
+
+
+def subtree_height(db: Session, category_id: str) -> int:
+    return db.query(func.max(CategoryClosure.depth)).filter(CategoryClosure.ancestor_id == category_id).scalar() or 0
+
+
+def add_category(db: Session, category_id: str, parent_id: Optional[str]):
+    """Closure rows for a new leaf: itself, plus each of the parent's ancestors one level further."""
+    db.execute(insert(CategoryClosure).values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+    if parent_id:
+        db.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(CategoryClosure.ancestor_id, literal(category_id), CategoryClosure.depth + 1)
+                .where(CategoryClosure.descendant_id == parent_id),
+            )
+        )
+
+
+def move_category(db: Session, category_id: str, parent_id: Optional[str]):
+    """Re-hang a subtree: drop its links to the old ancestors, then link it under the new parent's."""
+    subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+    old_ancestors = select(CategoryClosure.ancestor_id).where(
+        CategoryClosure.descendant_id == category_id, CategoryClosure.ancestor_id != category_id
+    )
+    db.execute(
+        delete(CategoryClosure)
+        .where(CategoryClosure.descendant_id.in_(subtree), CategoryClosure.ancestor_id.in_(old_ancestors))
+        .execution_options(synchronize_session=False)
+    )
+    if parent_id:
+        up, down = aliased(CategoryClosure), aliased(CategoryClosure)
+        db.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(up.ancestor_id, down.descendant_id, up.depth + down.depth + 1)
+                .select_from(up)
+                .join(down, true())  # every new ancestor x every node of the subtree
+                .where(up.descendant_id == parent_id, down.ancestor_id == category_id),
+            )
+        )
+
+
+def refresh_subtree_paths(db: Session, category: Category):
+    """Recompute level/full_path below `category` after it was renamed or moved."""
+    rows = (
+        db.query(Category)
+        .join(CategoryClosure, and_(CategoryClosure.descendant_id == Category.id, CategoryClosure.ancestor_id == category.id))
+        .filter(CategoryClosure.depth > 0)
+        .order_by(CategoryClosure.depth)
+        .all()
+    )
+    paths = {category.id: category.full_path}
+    for c in rows:  # parents come before their children
+        c.level, c.full_path = calc_category_path(paths.get(c.parent_id), c.slug)
+        paths[c.id] = c.full_path
+
+
+def rebuild_closure(db: Session) -> int:
+    parents = dict(db.query(Category.id, Category.parent_id))
+    rows = []
+    for cid in parents:
+        node, depth, seen = cid, 0, set()
+        while node is not None and node not in seen:  # `seen` guards against a corrupt cycle
+            seen.add(node)
+            rows.append({"ancestor_id": node, "descendant_id": cid, "depth": depth})
+            parent = parents[node]
+            node, depth = (parent if parent in parents else None), depth + 1
+    db.execute(delete(CategoryClosure))
+    if rows:
+        db.execute(insert(CategoryClosure), rows)
+    db.commit()
+    return len(rows)
+
+
+def ensure_category_closure(db: Session) -> None:
+    # first run, or categories written outside the API (seed scripts): rebuild when out of step
+    try:
+        categories = db.query(func.count(Category.id)).scalar()
+        self_links = db.query(func.count()).select_from(CategoryClosure).filter(CategoryClosure.depth == 0).scalar()
+        if categories != self_links:
+            logger.info("Rebuilt category closure: %d rows", rebuild_closure(db))
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to build category closure")
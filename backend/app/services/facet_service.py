@@ -0,0 +1,236 @@
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+from sqlalchemy import case, delete, func, literal, literal_column, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Query, Session, load_only
+from app.core.config import settings
+from app.models.product import Product, ProductStatus
+from app.models.product_facet import ProductFacet
+
+logger = logging.getLogger(__name__)
+
+LIST_FACETS = {"tag": "tags", "skin_type": "skin_type", "hair_type": "hair_type"}
+FACET_NAMES = ("brand", "price", *LIST_FACETS)
+MAX_VALUE_LEN = 255
+# stripped from facet values; the live SQL counts strip exactly these characters as well
+FACET_WHITESPACE = " \t\n\r\f\v"
+
+
+def price_buckets() -> list[dict]:
+    edges = sorted(settings.PRICE_BUCKET_EDGES)
+    buckets = []
+    lo = 0
+    for edge in edges:
+        label = f"Under {edge - 1}" if lo == 0 else f"{lo} - {edge - 1}"
+        buckets.append({"label": label, "min": lo, "max": edge - 1})
+        lo = edge
+    buckets.append({"label": f"{lo}+", "min": lo, "max": None})
+    return buckets
+
+
+def price_bucket_label(price) -> Optional[str]:
+    if price is None:
+        return None
+    price = float(price)
+    for b in price_buckets():
+        if b["max"] is None or price < b["max"] + 1:
+            return b["label"]
+    return None
+
+
+def facet_value(value) -> Optional[str]:
+    """A brand or list value as stored in product_facets, or None when blank."""
+    if not isinstance(value, str):
+        return None
+    return value.strip(FACET_WHITESPACE)[:MAX_VALUE_LEN] or None
+
+
+def _sql_facet_value(column, dialect: str):
+    # facet_value() in SQL, so live counts group values exactly like the materialized ones
+    trim = func.btrim if dialect == "postgresql" else func.trim
+    return func.substr(trim(column, FACET_WHITESPACE), 1, MAX_VALUE_LEN)
+
+
+def product_facet_values(product: Product) -> set[tuple[str, str]]:
+    """Facet (name, value) pairs a product contributes; empty unless it is listed."""
+    if not product.is_active or product.status != ProductStatus.active:
+        return set()
+    out = set()
+    brand = facet_value(product.brand)
+    if brand:
+        out.add(("brand", brand))
+    for facet, attr in LIST_FACETS.items():
+        for v in getattr(product, attr, None) or []:
+            v = facet_value(v)
+            if v:
+                out.add((facet, v))
+    bucket = price_bucket_label(product.base_price)
+    if bucket:
+        out.add(("price", bucket))
+    return out
+
+
+def _upsert_counts(db: Session, deltas: dict[tuple[str, str], int]):
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        rows = [{"facet": f, "value": v, "product_count": d} for (f, v), d in deltas.items()]
+        stmt = insert(ProductFacet).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ProductFacet.facet, ProductFacet.value],
+            set_={"product_count": ProductFacet.product_count + stmt.excluded.product_count, "updated_at": func.now()},
+        )
+        db.execute(stmt)
+        return
+    for (f, v), d in deltas.items():
+        res = db.execute(
+            update(ProductFacet)
+            .where(ProductFacet.facet == f, ProductFacet.value == v)
+            .values(product_count=ProductFacet.product_count + d)
+        )
+        if res.rowcount == 0:
+            db.add(ProductFacet(facet=f, value=v, product_count=d))
+
+
+def apply_facet_delta(db: Session, before: Iterable[tuple[str, str]], after: Iterable[tuple[str, str]]):
+    """Adjust facet counts for one product write; runs inside the caller's transaction."""
+    before, after = set(before), set(after)
+    apply_facet_counts(db, Counter(after - before), Counter(before - after))
+
+
+def apply_facet_counts(db: Session, added: Counter, removed: Counter):
+    deltas: dict[tuple[str, str], int] = {}
+    for k, n in added.items():
+        deltas[k] = deltas.get(k, 0) + n
+    for k, n in removed.items():
+        deltas[k] = deltas.get(k, 0) - n
+    deltas = {k: d for k, d in deltas.items() if d}
+    if not deltas:
+        return
+    _upsert_counts(db, deltas)
+    if any(d < 0 for d in deltas.values()):
+        db.execute(delete(ProductFacet).where(ProductFacet.product_count <= 0))
+
+
+def rebuild_facets(db: Session, batch_size: int = 1000) -> int:
+    counts: Counter = Counter()
+    cols = [Product.brand, Product.tags, Product.skin_type, Product.hair_type, Product.base_price, Product.is_active, Product.status]
+    products = (
+        db.query(Product)
+        .options(load_only(*cols))
+        .filter(Product.is_active == True, Product.status == ProductStatus.active)
+        .yield_per(batch_size)
+    )
+    for p in products:
+        counts.update(product_facet_values(p))
+    db.execute(delete(ProductFacet))
+    if counts:
+        db.execute(
+            ProductFacet.__table__.insert(),
+            [{"facet": f, "value": v, "product_count": n} for (f, v), n in counts.items()],
+        )
+    db.commit()
+    return len(counts)
+
+
+def facets_in_sync(db: Session) -> bool:
+    """Cheap drift check: every listed product adds exactly one price bucket and at most one brand,
+    so those facet sums must equal the matching product counts. Brands are normalized like
+    product_facet_values does, or blank and padded values would always look like drift."""
+    listed = (Product.is_active == True, Product.status == ProductStatus.active)
+    brand = _sql_facet_value(Product.brand, db.get_bind().dialect.name)
+    priced = db.query(func.count(Product.id)).filter(*listed, Product.base_price.isnot(None)).scalar()
+    branded = db.query(func.count(Product.id)).filter(*listed, brand != "").scalar()
+    sums = dict(
+        db.query(ProductFacet.facet, func.sum(ProductFacet.product_count))
+        .filter(ProductFacet.facet.in_(("price", "brand")))
+        .group_by(ProductFacet.facet)
+    )
+    return (sums.get("price") or 0) == priced and (sums.get("brand") or 0) == branded
+
+
+def ensure_facets(db: Session) -> None:
+    # first run, or counts left behind by writes that bypass the API (seed scripts, manual SQL)
+    try:
+        if not facets_in_sync(db):
+            logger.info("Rebuilt product facets: %d values", rebuild_facets(db))
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to materialize product facets")
+
+
+def read_facets(db: Session) -> dict:
+    rows = (
+        db.query(ProductFacet.facet, ProductFacet.value, ProductFacet.product_count)
+        .filter(ProductFacet.product_count > 0)
+        .order_by(ProductFacet.facet, ProductFacet.value)
+        .all()
+    )
+    facets: dict[str, list[dict]] = {}
+    for facet, value, count in rows:
+        facets.setdefault(facet, []).append({"value": value, "count": count})
+    price_counts = {f["value"]: f["count"] for f in facets.pop("price", [])}
+    return {
+        "brands": [f["value"] for f in facets.get("brand", [])],
+        "tags": [f["value"] for f in facets.get("tag", [])],
+        "skin_types": [f["value"] for f in facets.get("skin_type", [])],
+        "hair_types": [f["value"] for f in facets.get("hair_type", [])],
+        "price_ranges": [{**b, "count": price_counts.get(b["label"], 0)} for b in price_buckets()],
+        "facets": facets,
+    }
+
+
+def _price_bucket_expr(price_col):
+    buckets = price_buckets()
+    whens = [(price_col < b["max"] + 1, literal(b["label"])) for b in buckets if b["max"] is not None]
+    return case(*whens, else_=literal(buckets[-1]["label"]))
+
+
+def facet_counts(db: Session, qset: Query, facets: Iterable[str], limit: int = 50) -> dict[str, list[dict]]:
+    """Per-facet value counts over the rows matched by a filtered Product query.
+
+    One grouped aggregate per requested facet, each over the same filtered subquery;
+    JSON list facets are unnested with the dialect's array-elements function. Values are
+    normalized like product_facet_values, so they match the materialized filter options.
+    """
+    facets = [f for f in dict.fromkeys(facets) if f in FACET_NAMES]
+    if not facets:
+        return {}
+    cols = [Product.id, Product.brand, Product.base_price] + [getattr(Product, a) for a in LIST_FACETS.values()]
+    matched = qset.with_entities(*cols).order_by(None).subquery("matched")
+    dialect = db.get_bind().dialect.name
+    out: dict[str, list[dict]] = {}
+    for facet in facets:
+        if facet == "brand":
+            # normalized in a subquery so the grouping does not repeat the expression's parameters
+            normalized = select(_sql_facet_value(matched.c.brand, dialect).label("value")).subquery("normalized")
+            value = normalized.c.value
+            stmt = select(value, func.count()).where(value != "").group_by(value)
+        elif facet == "price":
+            bucketed = select(_price_bucket_expr(matched.c.base_price).label("bucket")).subquery("bucketed")
+            value = bucketed.c.bucket
+            stmt = select(value, func.count()).group_by(value)
+        else:
+            arr = matched.c[LIST_FACETS[facet]]
+            if dialect == "postgresql":
+                arr = case((func.jsonb_typeof(arr) == "array", arr), else_=literal_column("'[]'::jsonb"))
+                elems = func.jsonb_array_elements_text(arr).table_valued("value").lateral("elems")
+            else:
+                elems = func.json_each(arr).table_valued("value").alias("elems")
+            normalized = (
+                select(matched.c.id, _sql_facet_value(elems.c.value, dialect).label("value"))
+                .select_from(matched)
+                .join(elems, true())
+                .subquery("normalized")
+            )
+            value = normalized.c.value
+            stmt = select(value, func.count(func.distinct(normalized.c.id))).where(value != "").group_by(value)
+        rows = db.execute(stmt.order_by(func.count().desc(), value).limit(limit)).all()
+        if facet == "price":
+            counts = {v: n for v, n in rows}
+            out[facet] = [{"value": b["label"], "count": counts.get(b["label"], 0)} for b in price_buckets()]
+        else:
+            out[facet] = [{"value": v, "count": n} for v, n in rows]
+    return out
@@ -0,0 +1,182 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.category import Category
+from app.models.order import OrderItem
+from app.models.product_image import ProductImage
+from app.services import media_store
+from app.utils.images import SAVE_OPTIONS, probe, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process has threads (cache sweepers, refreshers) that fork would copy mid-state
+            _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_image_workers():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds {settings.MAX_FILE_SIZE // (1024 * 1024)} MB limit")
+
+
+def _store_derivatives(result: dict, out_dir: str) -> dict:
+    derivatives = {}
+    for name, d in result.items():
+        formats = {}
+        for ext, f in d["formats"].items():
+            url, _ = media_store.store(os.path.join(out_dir, f["file"]), f".{ext}")
+            formats[ext] = {"url": url, "size": f["size"]}
+        derivatives[name] = {"width": d["width"], "height": d["height"], "formats": formats}
+    return derivatives
+
+
+def _record(image_url: str, out_dir: str, future: Future):
+    # runs on an executor thread in this process once the worker finishes
+    try:
+        try:
+            result = future.result()
+        except Exception:
+            logger.exception("Resizing %s failed", image_url)
+            return
+        db = SessionLocal()
+        try:
+            # identical uploads share one original, so every row pointing at it gets the derivatives
+            images = [img for img in db.query(ProductImage).filter(ProductImage.image_url == image_url) if not img.derivatives]
+            if not images:  # deleted (or filled by a concurrent job) while it was being resized
+                return
+            derivatives = _store_derivatives(result, out_dir)
+            for img in images:
+                img.derivatives = derivatives
+            db.commit()
+        except Exception:
+            logger.exception("Recording derivatives for %s failed", image_url)
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def _submit(image_url: str):
+    global _pool
+    src = media_store.path_for_url(image_url)
+    out_dir = media_store.temp_path()
+    os.makedirs(out_dir)
+    try:
+        future = _executor().submit(render_derivatives, src, out_dir)
+    except BrokenProcessPool:
+        # a worker died (e.g. out of memory); start a fresh pool for this and later uploads
+        with _pool_lock:
+            _pool = None
+        future = _executor().submit(render_derivatives, src, out_dir)
+    future.add_done_callback(lambda f: _record(image_url, out_dir, f))
+
+
+def store_product_image(db: Session, product_id: str, upload: UploadFile, alt_text: Optional[str] = None, sort_order: int = 0) -> ProductImage:
+    """Save an uploaded original in the media store, create its ProductImage row and queue the derivatives.
+
+    Re-uploading bytes that are already stored reuses the stored original and, once resized,
+    its derivatives.
+    """
+    ext = os.path.splitext(upload.filename or "")[1].lower()
+    if ext not in settings.ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type; allowed: {', '.join(settings.ALLOWED_IMAGE_EXTENSIONS)}")
+    temp, digest, size = media_store.stream_to_temp(upload.file, settings.MAX_FILE_SIZE, _too_large)
+    info = probe(temp)
+    if info is None:
+        media_store.discard(temp)
+        raise HTTPException(status_code=400, detail="File is not a valid image")
+    # name by the decoded format so .jpg/.jpeg uploads of the same bytes share one file
+    url, created = media_store.store(temp, "." + SAVE_OPTIONS[info["format"]][0], digest)
+    derivatives = None
+    if not created:
+        derivatives = next((d for (d,) in db.query(ProductImage.derivatives).filter(ProductImage.image_url == url) if d), None)
+    img = ProductImage(
+        product_id=product_id, image_url=url, alt_text=alt_text, sort_order=sort_order,
+        width=info["width"], height=info["height"], file_size=size, derivatives=derivatives,
+    )
+    db.add(img)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()  # the stored file may already back another row; the media sweep removes it if not
+        raise
+    db.refresh(img)
+    if derivatives is None:
+        _submit(url)
+    return img
+
+
+def _derivative_urls(derivatives: Optional[dict]) -> Iterable[str]:
+    for d in (derivatives or {}).values():
+        for f in d.get("formats", {}).values():
+            if f.get("url"):
+                yield f["url"]
+
+
+def referenced_media_urls(db: Session, batch_size: int = 5000) -> set:
+    """Every URL a row can point a stored file at: images and their derivatives, categories, order items."""
+    urls = set()
+    for url, derivatives in db.query(ProductImage.image_url, ProductImage.derivatives).yield_per(batch_size):
+        urls.add(url)
+        urls.update(_derivative_urls(derivatives))
+    for column in (Category.image_url, OrderItem.product_image_url):
+        urls.update(u for (u,) in db.query(column).filter(column.isnot(None)).distinct().yield_per(batch_size))
+    return urls
+
+
+def collect_media_garbage() -> int:
+    """Remove stored media no row references any more (see media_store.sweep)."""
+    db = SessionLocal()
+    try:
+        referenced = referenced_media_urls(db)
+    finally:
+        db.close()
+    removed = media_store.sweep(referenced, settings.MEDIA_GC_GRACE_SECONDS)
+    if removed:
+        logger.info("Media sweep removed %d unreferenced files", removed)
+    return removed
+
+
+_gc_thread: Optional[threading.Thread] = None
+
+
+def start_media_gc():
+    global _gc_thread
+    if _gc_thread is not None or settings.MEDIA_GC_INTERVAL_SECONDS <= 0:
+        return
+
+    def loop():
+        while True:
+            time.sleep(settings.MEDIA_GC_INTERVAL_SECONDS)
+            try:
+                collect_media_garbage()
+            except Exception:
+                logger.exception("Media sweep failed")
+
+    _gc_thread = threading.Thread(target=loop, name="media-gc", daemon=True)
+    _gc_thread.start()
@@ -0,0 +1,170 @@
+import logging
+import threading
+from typing import Iterable, List, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.product import Product
+from app.utils.cache import on_remote_invalidation
+
+logger = logging.getLogger(__name__)
+
+# products reloaded per query when patching an index by id
+PATCH_BATCH_SIZE = 500
+
+
+class SwappableIndex:
+    """Mixin for in-process indexes that are rebuilt into a fresh instance and swapped in.
+
+    Subclasses provide `build_from(products)`, `upsert(product)`, `remove(product_id)`,
+    a `ready` flag and a `_lock`; `_products(db, batch_size)` selects what a build reads.
+    """
+
+    def _empty(self):
+        return type(self)()
+
+    def _products(self, db: Session, batch_size: int):
+        raise NotImplementedError
+
+    def snapshot(self, db: Session, batch_size: int = 1000):
+        """A new, fully built index; this one keeps serving until it is `adopt`ed."""
+        fresh = self._empty()
+        fresh.build_from(self._products(db, batch_size))
+        return fresh
+
+    def adopt(self, fresh):
+        with self._lock:
+            self.__dict__.update((k, v) for k, v in vars(fresh).items() if k != "_lock")
+
+    def build(self, db: Session, batch_size: int = 1000) -> int:
+        fresh = self.snapshot(db, batch_size)
+        self.adopt(fresh)
+        return len(fresh)
+
+
+def patch(db: Session, index, ids: Iterable[str]):
+    """Re-read products by id and upsert them into `index`; ids no longer in the catalog are removed."""
+    ids = list(ids)
+    # a new transaction, so rows committed since the session last read are seen
+    db.rollback()
+    for start in range(0, len(ids), PATCH_BATCH_SIZE):
+        chunk = ids[start:start + PATCH_BATCH_SIZE]
+        # the session may still hold these rows (with deferred columns) from a build
+        found = db.query(Product).filter(Product.id.in_(chunk)).populate_existing().all()
+        for product in found:
+            index.upsert(product)
+        for product_id in set(chunk) - {p.id for p in found}:
+            index.remove(product_id)
+
+
+class IndexBuild:
+    """Single-flight background maintenance of an in-process index.
+
+    One daemon thread at a time runs full builds (`request()`) and applies writes announced
+    by id (`changed()`), so neither ever blocks a request. While a build reads the catalog
+    the old index keeps serving and receiving upserts; the ids written meanwhile are replayed
+    against the new snapshot before it is swapped in, so no write is lost to a build.
+    """
+
+    def __init__(self, name: str, index: SwappableIndex):
+        self.name = name
+        self.index = index
+        self.running = False
+        self.pending = False  # a full build was requested
+        self.building = False
+        self.changed_ids: set = set()  # to patch into the live index
+        self.journal: set = set()  # written while a build runs, to replay on its snapshot
+        self._lock = threading.Lock()
+
+    @property
+    def usable(self) -> bool:
+        return self.index.ready
+
+    def request(self):
+        with self._lock:
+            self.pending = True
+            self._start_locked()
+
+    def ensure(self):
+        """Start a build unless the index is built or one is under way (e.g. after a failed build).
+
+        With SEARCH_INDEX_ENABLED off nothing is built and callers keep using the database.
+        """
+        if settings.SEARCH_INDEX_ENABLED and not self.usable and not self.running:
+            self.request()
+
+    def refresh(self):
+        # only an index that was built (or is being built) needs refreshing; unbuilt ones are built on first use
+        if self.index.ready or self.building:
+            self.request()
+
+    def upsert(self, product):
+        """Apply a committed write of this process to the index."""
+        with self._lock:
+            if self.building:
+                self.journal.add(product.id)
+        self.index.upsert(product)
+
+    def changed(self, ids: Optional[List[str]]):
+        """Writes announced by another worker: patch the given products, or rebuild if unknown."""
+        if ids is None:
+            self.refresh()
+            return
+        with self._lock:
+            if self.building:
+                self.journal.update(ids)
+            elif ids and self.index.ready:
+                self.changed_ids.update(ids)
+                self._start_locked()
+
+    def _start_locked(self):
+        if self.running:
+            return
+        self.running = True
+        threading.Thread(target=self._run, name=f"index-build-{self.name}", daemon=True).start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                full, ids = self.pending, self.changed_ids
+                self.pending, self.changed_ids = False, set()
+                if not full and not ids:
+                    self.running = False
+                    return
+                self.building = full
+            db = SessionLocal()
+            try:
+                if full:
+                    self._build(db)
+                else:
+                    patch(db, self.index, ids)
+            except Exception:
+                logger.exception("Updating %s index failed", self.name)
+                with self._lock:
+                    # the live index has not seen writes announced during the build; patch them in
+                    self.changed_ids |= self.journal
+                    self.journal, self.building = set(), False
+            finally:
+                db.close()
+
+    def _build(self, db: Session):
+        fresh = self.index.snapshot(db)
+        while True:
+            with self._lock:
+                ids, self.journal = self.journal, set()
+            if not ids:
+                break
+            patch(db, fresh, ids)
+        with self._lock:
+            # whatever was written since the last round is replayed with upserts held off,
+            # so nothing lands on the old index between the replay and the swap
+            patch(db, fresh, self.journal)
+            self.journal, self.building = set(), False
+            self.index.adopt(fresh)
+        logger.info("Rebuilt %s index with %d products", self.name, len(fresh))
+
+
+def refresh_on_remote_writes(build: IndexBuild):
+    # product writes in other workers bump the "search" namespace with the ids they touched;
+    # our own writes are upserted directly
+    on_remote_invalidation("search", build.changed)
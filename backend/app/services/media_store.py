@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# content-addressed files live at media/<first two hex chars>/<sha256><ext>
+MEDIA_DIR = "media"
+TMP_DIR = os.path.join(MEDIA_DIR, "tmp")
+CHUNK_SIZE = 1024 * 1024
+
+
+def _root() -> str:
+    return settings.STATIC_FILES_PATH
+
+
+def media_rel_path(digest: str, ext: str) -> str:
+    return os.path.join(MEDIA_DIR, digest[:2], f"{digest}{ext}")
+
+
+def url_for(rel_path: str) -> str:
+    return f"{settings.STATIC_FILES_URL.rstrip('/')}/{rel_path.replace(os.sep, '/')}"
+
+
+def path_for_url(url: str) -> Optional[str]:
+    """Filesystem path of a URL under the static mount, or None for external URLs."""
+    prefix = settings.STATIC_FILES_URL.rstrip("/") + "/"
+    if not url or not url.startswith(prefix):
+        return None
+    rel = os.path.normpath(url[len(prefix):])
+    if rel.startswith("..") or os.path.isabs(rel):
+        return None
+    return os.path.join(_root(), rel)
+
+
+def temp_path(suffix: str = "") -> str:
+    tmp = os.path.join(_root(), TMP_DIR)
+    os.makedirs(tmp, exist_ok=True)
+    return os.path.join(tmp, f"{uuid.uuid4().hex}{suffix}")
+
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stream_to_temp(src: BinaryIO, max_size: int, on_too_large: Callable[[], Exception]) -> Tuple[str, str, int]:
+    """Copy `src` to a temp file in chunks, hashing as it goes; returns (temp path, sha256, size)."""
+    path = temp_path()
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_size:
+                    raise on_too_large()
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        discard(path)
+        raise
+    return path, h.hexdigest(), size
+
+
+def store(temp: str, ext: str, digest: Optional[str] = None) -> Tuple[str, bool]:
+    """Move a temp file into the content-addressed store; returns (url, created).
+
+    When the same bytes are already stored the temp file is dropped and the existing
+    URL returned, so duplicate uploads take no extra space.
+    """
+    digest = digest or hash_file(temp)
+    rel = media_rel_path(digest, ext.lower())
+    dest = os.path.join(_root(), rel)
+    if os.path.exists(dest):
+        try:
+            os.utime(dest)  # fresh mtime keeps it out of the sweep until the caller's row commits
+            discard(temp)
+            return url_for(rel), False
+        except FileNotFoundError:  # swept just now: fall through and store these bytes again
+            pass
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(temp, dest)  # atomic; a concurrent identical upload just replaces equal bytes
+    return url_for(rel), True
+
+
+def discard(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def delete_url(url: str):
+    """Remove a stored file; callers check it is no longer referenced."""
+    discard(path_for_url(url))
+
+
+def sweep(referenced: Iterable[str], grace_seconds: int) -> int:
+    """Delete stored files whose URL is not in `referenced` and temp leftovers, once older than the grace period.
+
+    Files are shared by every row with the same bytes, so nothing is deleted inline; this
+    mark-and-sweep is the only place stored files go away. Returns the number removed.
+    """
+    referenced = set(referenced)
+    cutoff = time.time() - grace_seconds
+    media = os.path.join(_root(), MEDIA_DIR)
+    tmp = os.path.join(_root(), TMP_DIR)
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(media):
+        if os.path.normpath(dirpath) == os.path.normpath(tmp):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True) if os.path.isdir(path) else discard(path)
+                    removed += 1
+            dirnames[:] = []
+            continue
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            url = url_for(os.path.relpath(path, _root()))
+            try:
+                if url in referenced or os.path.getmtime(path) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            delete_url(url)
+            removed += 1
+    return removed
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.product import Product
+from app.models.product_category import ProductCategory
+from app.models.product_image import ProductImage
+from app.models.product_variant import ProductVariant
+from app.services.product_import import CSV_LIST_FIELDS, LIST_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+# the ProductCreate fields first so an export can be fed back to the importer, then read-only columns
+PRODUCT_FIELDS = [
+    "name", "sku", "short_description", "detailed_description", "category_id", "brand", "base_price",
+    "compare_price", "ingredients", "usage_instructions", "benefits", "skin_type", "hair_type",
+    "track_inventory", "inventory_quantity", "is_featured", "tags", "meta_title", "meta_description",
+    "id", "slug", "status", "is_active", "cost_price", "weight", "dimensions", "warnings", "age_group",
+    "low_stock_threshold", "continue_selling", "requires_shipping", "seo_keywords",
+    "average_rating", "total_reviews", "total_sales", "created_at", "updated_at",
+]
+VARIANT_FIELDS = [
+    "title", "sku", "price", "compare_price", "inventory_quantity", "size", "color", "scent", "barcode",
+    "is_active", "id", "sort_order",
+]
+IMAGE_FIELDS = ["image_url", "alt_text", "sort_order", "image_type", "is_primary", "id"]
+CSV_COLUMNS = PRODUCT_FIELDS + ["categories", "images", "variants"]
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_plain, ensure_ascii=False, separators=(",", ":"))
+
+
+def _children(db: Session, model, fields: List[str], ids: List[str], order_by) -> dict:
+    cols = [getattr(model, f) for f in fields]
+    rows = db.execute(select(model.product_id, *cols).where(model.product_id.in_(ids)).order_by(model.product_id, order_by))
+    out: dict = {}
+    for row in rows:
+        out.setdefault(row[0], []).append(dict(zip(fields, row[1:])))
+    return out
+
+
+def _records(db: Session, status: Optional[str], batch_size: int) -> Iterator[List[dict]]:
+    """Yields lists of product dicts with their variants, images and categories, one list per fetched batch."""
+    stmt = select(*[getattr(Product, f) for f in PRODUCT_FIELDS]).order_by(Product.created_at, Product.id)
+    if status:
+        stmt = stmt.where(Product.status == status)
+    # stream_results makes this a server-side cursor on Postgres; yield_per bounds each fetch
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    for part in result.partitions():
+        products = [dict(zip(PRODUCT_FIELDS, row)) for row in part]
+        ids = [p["id"] for p in products]
+        variants = _children(db, ProductVariant, VARIANT_FIELDS, ids, ProductVariant.sort_order)
+        images = _children(db, ProductImage, IMAGE_FIELDS, ids, ProductImage.sort_order)
+        categories = _children(db, ProductCategory, ["category_id", "is_primary"], ids, ProductCategory.category_id)
+        for p in products:
+            p["categories"] = [{"id": c["category_id"], "is_primary": c["is_primary"]} for c in categories.get(p["id"], [])]
+            p["images"] = images.get(p["id"], [])
+            p["variants"] = variants.get(p["id"], [])
+        yield products
+
+
+def _csv_chunks(batches: Iterator[List[dict]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    # on its own, so an empty catalog still exports a header
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    for products in batches:
+        for p in products:
+            row = []
+            for col in CSV_COLUMNS:
+                val = p.get(col)
+                if col == "images":
+                    val = LIST_SEPARATOR.join(m["image_url"] for m in val)
+                elif col == "categories":
+                    val = LIST_SEPARATOR.join(c["id"] for c in val)
+                elif col == "variants":
+                    val = _dumps(val) if val else ""
+                elif col in CSV_LIST_FIELDS and isinstance(val, list):
+                    val = LIST_SEPARATOR.join(str(v) for v in val)
+                elif isinstance(val, (dict, list)):
+                    val = _dumps(val)
+                elif val is not None and not isinstance(val, (str, int, float)):
+                    val = _plain(val)
+                row.append("" if val is None else val)
+            writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def _ndjson_chunks(batches: Iterator[List[dict]]) -> Iterator[str]:
+    for products in batches:
+        yield "".join(_dumps(p) + "\n" for p in products)
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def export_products(fmt: str, status: Optional[str] = None, compress: bool = False, batch_size: int = 1000) -> Iterator[bytes]:
+    """Streams the catalog as CSV or NDJSON bytes in constant memory.
+
+    Runs on its own session because the response body is produced after the request
+    handler (and its session dependency) has returned.
+    """
+    def body() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            batches = _records(db, status, batch_size)
+            chunks = _ndjson_chunks(batches) if fmt == "ndjson" else _csv_chunks(batches)
+            for chunk in chunks:
+                yield chunk.encode("utf-8")
+        except Exception:
+            logger.exception("Catalog export failed")
+            raise
+        finally:
+            db.close()
+
+    return _gzip(body()) if compress else body()
@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+import logging
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import IO, Callable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.models.category import Category
+from app.models.product import Product, ProductStatus, default_uuid
+from app.models.product_category import ProductCategory
+from app.models.product_image import ProductImage
+from app.models.product_variant import ProductVariant
+from app.schemas.product import ProductCreate
+from app.services.facet_service import apply_facet_counts, product_facet_values
+from app.utils.helpers import slugify
+
+logger = logging.getLogger(__name__)
+
+# CSV cells holding several values; variants is a JSON array of ProductVariantCreate objects
+CSV_LIST_FIELDS = {"tags", "skin_type", "hair_type", "images", "categories"}
+LIST_SEPARATOR = "|"
+MAX_REPORTED_ERRORS = 1000
+
+
+def _csv_rows(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    reader = csv.DictReader(stream)
+    for raw in reader:
+        error = None
+        row = {}
+        for k, v in raw.items():
+            if k is None or v is None or not v.strip():
+                continue
+            k, v = k.strip(), v.strip()
+            if k in CSV_LIST_FIELDS:
+                items = [x.strip() for x in v.split(LIST_SEPARATOR) if x.strip()]
+                if k == "images":
+                    items = [{"image_url": url} for url in items]
+                elif k == "categories":
+                    items = [{"id": cid} for cid in items]
+                row[k] = items
+            elif k == "variants":
+                try:
+                    row[k] = json.loads(v)
+                except json.JSONDecodeError as e:
+                    error = f"variants: invalid JSON ({e.msg})"
+            else:
+                row[k] = v
+        yield reader.line_num, row, error
+
+
+def _ndjson_rows(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"Invalid JSON ({e.msg})"
+            continue
+        yield line_no, data, (None if isinstance(data, dict) else "Expected a JSON object")
+
+
+class _Batch:
+    def __init__(self):
+        self.products: List[dict] = []
+        self.variants: List[dict] = []
+        self.images: List[dict] = []
+        self.links: List[dict] = []
+        self.facets: Counter = Counter()
+        self.lines: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def only(self, i: int) -> "_Batch":
+        pid = self.products[i]["id"]
+        one = _Batch()
+        one.products = [self.products[i]]
+        one.variants = [v for v in self.variants if v["product_id"] == pid]
+        one.images = [m for m in self.images if m["product_id"] == pid]
+        one.links = [c for c in self.links if c["product_id"] == pid]
+        one.lines = [self.lines[i]]
+        one.facets = Counter(product_facet_values(SimpleNamespace(**self.products[i])))
+        return one
+
+
+class ProductImporter:
+    """Streams a CSV/NDJSON catalog into the database in batches.
+
+    Rows are validated as ProductCreate, SKUs and slugs are checked against sets preloaded
+    from the catalog (and extended as rows are accepted), and each batch is written with one
+    executemany per table plus one facet-count upsert, then committed. If a batch hits a
+    database error it is retried product by product so only the offending rows fail.
+    Memory is bounded by the batch size and the catalog's SKU/slug sets, not the file.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 500, on_commit: Optional[Callable[[List[Product]], None]] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self.product_skus = {s for (s,) in db.query(Product.sku).filter(Product.sku.isnot(None))}
+        self.variant_skus = {s for (s,) in db.query(ProductVariant.sku).filter(ProductVariant.sku.isnot(None))}
+        self.slugs = {s for (s,) in db.query(Product.slug)}
+        self.category_ids = {c for (c,) in db.query(Category.id)}
+        self.rows = self.created = self.failed = 0
+        self.errors: List[dict] = []
+
+    def _error(self, line: int, sku: Optional[str], message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line, "sku": sku, "error": message})
+
+    def _unique_slug(self, name: str) -> str:
+        base = slugify(name) or "product"
+        slug, n = base, 1
+        while slug in self.slugs:
+            n += 1
+            slug = f"{base}-{n}"
+        return slug
+
+    def _stage(self, batch: _Batch, line: int, payload: ProductCreate) -> Optional[str]:
+        """Add one validated row to the batch; returns an error message instead if it is rejected."""
+        if payload.inventory_quantity is not None and payload.inventory_quantity < 0:
+            return "Inventory cannot be negative"
+        if payload.sku and payload.sku in self.product_skus:
+            return f"Product SKU '{payload.sku}' already exists"
+        variants = payload.variants or []
+        skus = [v.sku for v in variants if v.sku]
+        if len(skus) != len(set(skus)):
+            return "Duplicate variant SKU within product"
+        for sku in skus:
+            if sku in self.variant_skus:
+                return f"Variant SKU '{sku}' already exists"
+        if any(v.inventory_quantity is not None and v.inventory_quantity < 0 for v in variants):
+            return "Variant inventory cannot be negative"
+        if variants and not any(v.is_active for v in variants):
+            return "At least one active variant is required"
+        categories = {c.id: c.is_primary for c in payload.categories or []}
+        if payload.category_id:
+            categories.setdefault(payload.category_id, True)
+        unknown = [c for c in categories if c not in self.category_ids]
+        if unknown:
+            return f"Unknown category: {', '.join(unknown)}"
+
+        pid = default_uuid()
+        slug = self._unique_slug(payload.name)
+        product = payload.model_dump(exclude={"categories", "images", "variants"})
+        product.update(
+            id=pid, slug=slug, is_active=True, status=ProductStatus.active,
+            average_rating=0, total_reviews=0, total_sales=0,
+        )
+        batch.products.append(product)
+        batch.lines.append(line)
+        batch.facets.update(product_facet_values(SimpleNamespace(**product)))
+        for cid, primary in categories.items():
+            batch.links.append({"product_id": pid, "category_id": cid, "is_primary": primary})
+        for i, img in enumerate(payload.images or []):
+            batch.images.append({
+                "id": default_uuid(), "product_id": pid, "image_url": img.image_url, "alt_text": img.alt_text,
+                "sort_order": img.sort_order or i, "is_primary": False,
+            })
+        for i, v in enumerate(variants):
+            batch.variants.append({"id": default_uuid(), "product_id": pid, "sort_order": i, **v.model_dump()})
+        self.slugs.add(slug)
+        if payload.sku:
+            self.product_skus.add(payload.sku)
+        self.variant_skus.update(skus)
+        return None
+
+    def _write(self, batch: _Batch):
+        db = self.db
+        db.execute(insert(Product), batch.products)
+        for model, rows in ((ProductVariant, batch.variants), (ProductImage, batch.images), (ProductCategory, batch.links)):
+            if rows:
+                db.execute(insert(model), rows)
+        apply_facet_counts(db, batch.facets, Counter())
+        db.commit()
+        self.created += len(batch)
+        if self.on_commit:
+            # plain attribute bags are enough for the in-process indexes
+            self.on_commit([SimpleNamespace(**p) for p in batch.products])
+
+    def _flush(self, batch: _Batch):
+        if not batch:
+            return
+        try:
+            self._write(batch)
+        except DBAPIError:
+            self.db.rollback()
+            logger.warning("Import batch failed; retrying %d products one by one", len(batch), exc_info=True)
+            for i in range(len(batch)):
+                one = batch.only(i)
+                try:
+                    self._write(one)
+                except DBAPIError as e:
+                    self.db.rollback()
+                    self._error(one.lines[0], one.products[0].get("sku"), str(e.orig).splitlines()[0])
+
+    def run(self, stream: IO[str], fmt: str) -> dict:
+        started = time.perf_counter()
+        rows = _ndjson_rows(stream) if fmt == "ndjson" else _csv_rows(stream)
+        batch = _Batch()
+        while True:
+            try:
+                line, data, error = next(rows)
+            except StopIteration:
+                break
+            except (csv.Error, UnicodeDecodeError) as e:
+                # the reader can't resume after a malformed file
+                self._error(self.rows + 1, None, f"Unreadable input: {e}")
+                break
+            self.rows += 1
+            sku = data.get("sku") if isinstance(data, dict) else None
+            if error:
+                self._error(line, sku, error)
+                continue
+            try:
+                payload = ProductCreate.model_validate(data)
+            except ValidationError as e:
+                err = e.errors()[0]
+                self._error(line, sku, f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}")
+                continue
+            message = self._stage(batch, line, payload)
+            if message:
+                self._error(line, payload.sku, message)
+            elif len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = _Batch()
+        self._flush(batch)
+        seconds = time.perf_counter() - started
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "failed": self.failed,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def import_products(db: Session, upload: IO[bytes], fmt: str, batch_size: int = 500, on_commit=None) -> dict:
+    stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    try:
+        return ProductImporter(db, batch_size, on_commit).run(stream, fmt)
+    finally:
+        stream.detach()
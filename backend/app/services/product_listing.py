@@ -0,0 +1,39 @@
+from sqlalchemy import or_, select
+from sqlalchemy.orm import selectinload
+from app.models.product import Product
+from app.models.product_image import ProductImage
+from app.utils.pagination import Keyset
+
+# relationships embedded in ProductResponse; batch-load them instead of lazy loading per row
+PRODUCT_RELATIONS = (selectinload(Product.images), selectinload(Product.variants))
+
+
+# column projection for listing grids (ProductSummary); avoids loading descriptions and children
+def _primary_image(column):
+    return (
+        select(column)
+        .where(ProductImage.product_id == Product.id)
+        .order_by(ProductImage.is_primary.desc(), ProductImage.sort_order.asc())
+        .limit(1)
+        .correlate(Product)
+        .scalar_subquery()
+    )
+
+
+PRIMARY_IMAGE_URL = _primary_image(ProductImage.image_url)
+PRODUCT_SUMMARY_COLUMNS = (
+    Product.id, Product.name, Product.slug, Product.brand, Product.base_price, Product.compare_price,
+    Product.average_rating, Product.total_reviews, Product.inventory_quantity,
+    Product.created_at, Product.total_sales,  # keyset columns, needed to encode cursors
+    or_(Product.track_inventory == False, Product.inventory_quantity > 0).label("in_stock"),
+    PRIMARY_IMAGE_URL.label("primary_image"),
+    _primary_image(ProductImage.derivatives).label("primary_image_derivatives"),
+)
+
+# sort name -> keyset used for ordering and cursor pagination
+PRODUCT_KEYSETS = {
+    "created_at": Keyset("created_at", [Product.created_at, Product.id]),
+    "price_asc": Keyset("price_asc", [Product.base_price, Product.id], descending=False),
+    "price_desc": Keyset("price_desc", [Product.base_price, Product.id]),
+    "total_sales": Keyset("total_sales", [Product.total_sales, Product.id]),
+}
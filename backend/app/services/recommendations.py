@@ -0,0 +1,267 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.order import Order, OrderItem, OrderStatus, OrderStatusHistory
+from app.utils.pagination import Keyset, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20
+# pair counting is quadratic in basket size; very large orders say little about affinity anyway
+MAX_BASKET = 50
+EXCLUDED_STATUSES = (OrderStatus.cancelled, OrderStatus.refunded)
+# orders younger than this are left for the next sync, so rows committed late (or in the
+# same clock tick as the watermark) are not skipped
+SYNC_LAG = timedelta(seconds=5)
+# cancellations and refunds are taken back out only for orders placed this recently, which
+# bounds the set of counted order ids the model has to remember
+RECONCILE_WINDOW = timedelta(days=90)
+ORDER_KEYSET = Keyset("co_purchase", [Order.created_at, Order.id], descending=False)
+
+
+class CoPurchaseRecommender:
+    """"Frequently bought together" from order baskets.
+
+    Keeps a sparse product x product co-occurrence count (dict of Counters) plus the
+    number of orders per product, and the top-k neighbours of each product by cosine
+    similarity co(a, b) / sqrt(n(a) * n(b)), so lookups are a dict access. New orders
+    are folded in incrementally from a (created_at, id) watermark; only the neighbour
+    lists of products in those baskets and of their partners (whose scores moved with
+    n(a)) are recomputed. Folded orders placed within RECONCILE_WINDOW that are later
+    cancelled or refunded (found through their status history) are taken out again.
+    Syncs run on a background thread; lookups never wait for the database.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self.pairs: dict[str, Counter] = {}
+        self.orders_with: Counter = Counter()
+        self.neighbours: dict[str, List[Tuple[str, float]]] = {}
+        self.watermark: Optional[str] = None  # keyset cursor of the last folded order
+        self.counted: dict[str, datetime] = {}  # order id -> created_at, for counted orders within the window
+        self.status_since: Optional[datetime] = None  # status changes from here on are re-checked
+        self.ready = False
+        self.synced_at = 0.0
+        self.syncing = False
+        self._lock = threading.RLock()
+
+    def _baskets(self, db: Session, batch_size: int = 5000) -> Iterable[Tuple[tuple, set]]:
+        qset = (
+            db.query(OrderItem.product_id, Order.created_at, Order.id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(
+                OrderItem.product_id.isnot(None),
+                Order.status.notin_(EXCLUDED_STATUSES),
+                Order.created_at < datetime.now(timezone.utc) - SYNC_LAG,
+            )
+        )
+        if self.watermark:
+            vals = decode_cursor(ORDER_KEYSET, self.watermark, db.get_bind().dialect.name)
+            qset = qset.filter(tuple_(*ORDER_KEYSET.columns) > tuple_(*vals))
+        key, basket = None, set()
+        for product_id, created_at, order_id in qset.order_by(*ORDER_KEYSET.order_by()).yield_per(batch_size):
+            if (created_at, order_id) != key:
+                if basket:
+                    yield key, basket
+                key, basket = (created_at, order_id), set()
+            basket.add(product_id)
+        if basket:
+            yield key, basket
+
+    def _status_changes(self, db: Session, cutoff: datetime) -> Iterable[Tuple[tuple, bool, set]]:
+        """((created_at, order id), now excluded, basket) for already-folded orders placed after
+        `cutoff` whose status changed recently.
+
+        Decisions depend only on the order's current status and `counted`, so seeing the same
+        change twice (the windows overlap by SYNC_LAG) is harmless.
+        """
+        if not self.watermark or self.status_since is None:
+            return
+        changed = select(OrderStatusHistory.order_id).where(OrderStatusHistory.changed_at >= self.status_since)
+        vals = decode_cursor(ORDER_KEYSET, self.watermark, db.get_bind().dialect.name)
+        rows = (
+            db.query(OrderItem.order_id, Order.created_at, Order.status, OrderItem.product_id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(
+                Order.id.in_(changed),
+                Order.created_at >= cutoff,
+                OrderItem.product_id.isnot(None),
+                tuple_(*ORDER_KEYSET.columns) <= tuple_(*vals),  # newer orders are folded as usual
+            )
+            .order_by(OrderItem.order_id)
+        )
+        key, excluded, basket = None, False, set()
+        for oid, created_at, status, product_id in rows:
+            if key is None or oid != key[1]:
+                if basket:
+                    yield key, excluded, basket
+                key, excluded, basket = (created_at, oid), status in EXCLUDED_STATUSES, set()
+            basket.add(product_id)
+        if basket:
+            yield key, excluded, basket
+
+    def _reconcile(self, changes: Iterable[Tuple[tuple, bool, set]]) -> set:
+        """Apply cancellations/refunds (and reinstatements) of folded orders; returns touched products."""
+        touched: set = set()
+        for key, excluded, basket in changes:
+            if excluded and key[1] in self.counted:
+                self._remove(basket)
+                del self.counted[key[1]]
+            elif not excluded and key[1] not in self.counted:
+                self._add(basket)
+                self._count(key)
+            else:
+                continue
+            touched |= basket
+        return touched
+
+    def _count(self, key: tuple) -> None:
+        created_at = _utc(key[0])
+        if created_at >= datetime.now(timezone.utc) - RECONCILE_WINDOW:
+            self.counted[key[1]] = created_at
+
+    def _prune(self, cutoff: datetime) -> None:
+        # orders that aged out of the window are never reconciled, so need not be remembered
+        self.counted = {o: at for o, at in self.counted.items() if at >= cutoff}
+
+    def _advance(self, key: tuple) -> None:
+        self.watermark = encode_cursor(ORDER_KEYSET, SimpleNamespace(created_at=key[0], id=key[1]))
+
+    def _add(self, basket: set) -> None:
+        items = sorted(basket)[:MAX_BASKET]
+        for a in items:
+            self.orders_with[a] += 1
+            row = self.pairs.setdefault(a, Counter())
+            for b in items:
+                if a != b:
+                    row[b] += 1
+
+    def _remove(self, basket: set) -> None:
+        items = sorted(basket)[:MAX_BASKET]
+        for a in items:
+            self.orders_with[a] -= 1
+            if self.orders_with[a] <= 0:
+                del self.orders_with[a]
+            row = self.pairs.get(a)
+            if row is None:
+                continue
+            for b in items:
+                if a != b:
+                    row[b] -= 1
+                    if row[b] <= 0:
+                        del row[b]
+            if not row:
+                del self.pairs[a]
+
+    def _rerank(self, touched: set) -> None:
+        # n(a) is in the score of every pair a is part of, not just of the pairs that changed
+        for product_id in touched | {b for a in touched for b in self.pairs.get(a, ())}:
+            self._rank(product_id)
+
+    def _rank(self, product_id: str) -> None:
+        row = self.pairs.get(product_id)
+        if not row:
+            self.neighbours.pop(product_id, None)
+            return
+        na = self.orders_with[product_id]
+        scored = ((b, c / math.sqrt(na * self.orders_with[b]), c) for b, c in row.items())
+        top = heapq.nlargest(self.top_k, scored, key=lambda t: (t[1], t[2]))
+        self.neighbours[product_id] = [(b, round(s, 6)) for b, s, _ in top]
+
+    def build(self, db: Session) -> int:
+        started = time.perf_counter()
+        with self._lock:
+            self.pairs, self.orders_with, self.neighbours, self.watermark = {}, Counter(), {}, None
+            self.counted = {}
+            # status changes racing with the fold are re-checked on the next sync
+            self.status_since = datetime.now(timezone.utc) - SYNC_LAG
+            orders = self._fold(db)
+            for product_id in self.pairs:
+                self._rank(product_id)
+            self.ready = True
+        logger.info("Co-purchase recommendations built from %d orders in %.2fs", orders, time.perf_counter() - started)
+        return orders
+
+    def _fold(self, db: Session) -> int:
+        orders = 0
+        for key, basket in self._baskets(db):
+            self._add(basket)
+            self._count(key)
+            orders += 1
+        if orders:
+            self._advance(key)
+        self.synced_at = time.monotonic()
+        return orders
+
+    def request_sync(self, max_age: float) -> None:
+        """Start a background sync unless one ran within `max_age` seconds or is under way."""
+        if not self.ready or time.monotonic() - self.synced_at < max_age:
+            return
+        with self._lock:
+            if self.syncing:
+                return
+            self.syncing = True
+        threading.Thread(target=self._sync_in_background, name="co-purchase-sync", daemon=True).start()
+
+    def _sync_in_background(self) -> None:
+        db = SessionLocal()
+        try:
+            self.sync(db)
+        except Exception:
+            # retried once the sync interval has passed again, not on every request
+            self.synced_at = time.monotonic()
+            logger.exception("Co-purchase sync failed")
+        finally:
+            db.close()
+            self.syncing = False
+
+    def sync(self, db: Session) -> int:
+        """Fold in orders placed, cancelled or refunded since the last build/sync.
+
+        The queries run before the lock is taken, so only applying their results holds it.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - RECONCILE_WINDOW
+        changes = list(self._status_changes(db, cutoff))
+        baskets = list(self._baskets(db))
+        with self._lock:
+            touched = self._reconcile(changes)
+            self.status_since = now - SYNC_LAG
+            for key, basket in baskets:
+                self._add(basket)
+                self._count(key)
+                touched |= basket
+            if baskets:
+                self._advance(baskets[-1][0])
+            self._prune(cutoff)
+            self.synced_at = time.monotonic()
+            self._rerank(touched)
+        return len(baskets)
+
+    def related(self, product_id: str, limit: int = 8) -> List[str]:
+        return [b for b, _ in self.neighbours.get(product_id, ())[:limit]]
+
+
+def _utc(dt: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they are stored in UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+recommender = CoPurchaseRecommender()
+
+
+def build_recommendations(db: Session) -> int:
+    try:
+        return recommender.build(db)
+    except Exception:
+        logger.exception("Failed to build co-purchase recommendations")
+        return 0
@@ -0,0 +1,249 @@
+import bisect
+import heapq
+import logging
+import math
+import threading
+import time
+from operator import itemgetter
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
+from app.models.product import Product, ProductStatus
+from app.services.search_service import tokenize
+from app.services.index_refresh import IndexBuild, SwappableIndex, refresh_on_remote_writes
+
+logger = logging.getLogger(__name__)
+
+# field -> weight (term frequency multiplier), a cheap BM25F approximation
+FIELD_WEIGHTS = {
+    "name": 3,
+    "tags": 2,
+    "brand": 2,
+    "short_description": 1,
+    "detailed_description": 1,
+    "ingredients": 1,
+    "benefits": 1,
+}
+
+
+def _field_text(product: Product, field: str) -> str:
+    val = getattr(product, field, None)
+    if isinstance(val, list):
+        return " ".join(str(v) for v in val)
+    return str(val) if val else ""
+
+
+def product_terms(product: Product) -> Counter:
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for tok in tokenize(_field_text(product, field)):
+            terms[tok] += weight
+    return terms
+
+
+def trigrams(word: str) -> set[str]:
+    # padded like pg_trgm so scores line up with the database fuzzy path
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_searchable(product: Product) -> bool:
+    return bool(product.is_active) and product.status == ProductStatus.active
+
+
+class ProductSearchIndex(SwappableIndex):
+    """In-process inverted index over active products, scored with BM25.
+
+    All terms of a query must match (like the database full-text path); the last
+    query term is also prefix-expanded so search-as-you-type works. In fuzzy mode each
+    query term is instead expanded to vocabulary terms with a similar trigram set.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_expansions: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_expansions = max_prefix_expansions
+        self.postings: dict[str, dict[str, int]] = {}
+        self.doc_terms: dict[str, Counter] = {}
+        self.doc_len: dict[str, int] = {}
+        self.doc_norm: dict[str, float] = {}  # k1 * (1 - b + b * dl / avgdl), avgdl fixed at build time
+        self.avgdl = 0.0
+        self.total_len = 0
+        self.vocab: list[str] = []  # sorted, for prefix expansion
+        self.trigram_terms: dict[str, set[str]] = {}  # trigram -> vocabulary terms, for fuzzy expansion
+        self.ready = False
+        self.built_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def _empty(self) -> "ProductSearchIndex":
+        return ProductSearchIndex(self.k1, self.b, self.max_prefix_expansions)
+
+    def _products(self, db: Session, batch_size: int):
+        cols = [getattr(Product, f) for f in FIELD_WEIGHTS] + [Product.is_active, Product.status]
+        return (
+            db.query(Product)
+            .options(load_only(*cols))
+            .filter(Product.is_active == True, Product.status == ProductStatus.active)
+            .yield_per(batch_size)
+        )
+
+    def build_from(self, products: Iterable[Product]) -> int:
+        postings: dict[str, dict[str, int]] = {}
+        doc_terms: dict[str, Counter] = {}
+        doc_len: dict[str, int] = {}
+        for p in products:
+            terms = product_terms(p)
+            doc_terms[p.id] = terms
+            doc_len[p.id] = sum(terms.values())
+            for t, tf in terms.items():
+                postings.setdefault(t, {})[p.id] = tf
+        total_len = sum(doc_len.values())
+        avgdl = total_len / len(doc_len) if doc_len else 0.0
+        doc_norm = {d: self._norm(dl, avgdl) for d, dl in doc_len.items()}
+        with self._lock:
+            self.postings = postings
+            self.doc_terms = doc_terms
+            self.doc_len = doc_len
+            self.doc_norm = doc_norm
+            self.avgdl = avgdl
+            self.total_len = total_len
+            self.vocab = sorted(postings)
+            self.trigram_terms = {}
+            for t in self.vocab:
+                self._add_trigrams(t)
+            self.ready = True
+            self.built_at = time.time()
+        return len(doc_len)
+
+    def _norm(self, dl: int, avgdl: float) -> float:
+        return self.k1 * (1 - self.b + self.b * dl / avgdl) if avgdl else self.k1
+
+    def upsert(self, product: Product):
+        if not is_searchable(product):
+            self.remove(product.id)
+            return
+        terms = product_terms(product)
+        with self._lock:
+            self._remove_locked(product.id)
+            self.doc_terms[product.id] = terms
+            dl = sum(terms.values())
+            if not self.avgdl:
+                self.avgdl = float(dl)
+            self.doc_len[product.id] = dl
+            self.doc_norm[product.id] = self._norm(dl, self.avgdl)
+            self.total_len += dl
+            for t, tf in terms.items():
+                docs = self.postings.get(t)
+                if docs is None:
+                    docs = self.postings[t] = {}
+                    bisect.insort(self.vocab, t)
+                    self._add_trigrams(t)
+                docs[product.id] = tf
+
+    def remove(self, product_id: str):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _remove_locked(self, product_id: str):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self.total_len -= self.doc_len.pop(product_id, 0)
+        self.doc_norm.pop(product_id, None)
+        for t in terms:
+            docs = self.postings.get(t)
+            if docs is None:
+                continue
+            docs.pop(product_id, None)
+            if not docs:
+                del self.postings[t]
+                i = bisect.bisect_left(self.vocab, t)
+                if i < len(self.vocab) and self.vocab[i] == t:
+                    self.vocab.pop(i)
+                for g in trigrams(t):
+                    terms_for = self.trigram_terms.get(g)
+                    if terms_for is not None:
+                        terms_for.discard(t)
+                        if not terms_for:
+                            del self.trigram_terms[g]
+
+    def _add_trigrams(self, term: str):
+        for g in trigrams(term):
+            self.trigram_terms.setdefault(g, set()).add(term)
+
+    def _expand_prefix(self, prefix: str) -> List[Tuple[str, float]]:
+        i = bisect.bisect_left(self.vocab, prefix)
+        out = []
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix) and len(out) < self.max_prefix_expansions:
+            out.append((self.vocab[i], 1.0))
+            i += 1
+        return out
+
+    def _expand_fuzzy(self, token: str, threshold: float, max_postings: int) -> List[Tuple[str, float]]:
+        grams = trigrams(token)
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self.trigram_terms.get(g, ()))
+        similar = []
+        for term, common in shared.items():
+            sim = common / (len(grams) + len(trigrams(term)) - common)
+            if sim >= threshold:
+                similar.append((term, sim))
+        similar.sort(key=lambda ts: (-ts[1], ts[0]))
+        # cap the candidate set: take the closest terms until their postings exceed the budget
+        out, budget = [], max_postings
+        for term, sim in similar:
+            if out and len(self.postings[term]) > budget:
+                break
+            out.append((term, sim))
+            budget -= len(self.postings[term])
+        return out
+
+    def search(self, q: str, limit: int = 50, fuzzy: bool = False, threshold: float = 0.3,
+               max_candidates: int = 5000) -> List[Tuple[str, float]]:
+        tokens = list(dict.fromkeys(tokenize(q)))
+        if not tokens:
+            return []
+        k1p = self.k1 + 1
+        with self._lock:
+            n = len(self.doc_len)
+            if n == 0:
+                return []
+            # each query token maps to a group of (index term, weight)
+            if fuzzy:
+                groups = [self._expand_fuzzy(t, threshold, max_candidates) for t in tokens]
+            else:
+                groups = [[(t, 1.0)] if t in self.postings else [] for t in tokens[:-1]]
+                groups.append(self._expand_prefix(tokens[-1]))
+            if any(not g for g in groups):
+                return []
+            # rarest group first so later groups only score surviving candidates
+            groups.sort(key=lambda g: sum(len(self.postings[t]) for t, _ in g))
+            norm = self.doc_norm
+            scores: Optional[dict[str, float]] = None
+            for g in groups:
+                gs: dict[str, float] = {}
+                for t, weight in g:
+                    docs = self.postings[t]
+                    idf = weight * math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                    if scores is not None and len(scores) < len(docs):
+                        pairs = ((d, docs[d]) for d in scores if d in docs)
+                    else:
+                        pairs = docs.items()
+                    for doc_id, tf in pairs:
+                        gs[doc_id] = gs.get(doc_id, 0.0) + idf * tf * k1p / (tf + norm[doc_id])
+                if scores is None:
+                    scores = gs
+                else:
+                    scores = {d: sc + gs[d] for d, sc in scores.items() if d in gs}
+                if not scores:
+                    return []
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+
+product_index = ProductSearchIndex()
+product_index_build = IndexBuild("product search", product_index)
+refresh_on_remote_writes(product_index_build)
@@ -0,0 +1,68 @@
+import re
+from typing import Optional, Tuple
+from sqlalchemy import Float, bindparam, column, func, literal_column, select, text
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.elements import ColumnElement
+from app.models.product import Product, ProductStatus
+from app.models.product_search import FUZZY_DOC_SQL
+
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(q: str) -> list[str]:
+    return _token_re.findall((q or "").lower())
+
+
+def _ilike_clause(q: str) -> ColumnElement:
+    like = f"%{q.lower()}%"
+    return Product.name.ilike(like) | Product.short_description.ilike(like) | Product.detailed_description.ilike(like)
+
+
+def text_search(qset: Query, db: Session, q: str) -> Tuple[Query, Optional[ColumnElement]]:
+    """Restrict a Product query to rows matching free text q; returns (query, relevance).
+
+    Uses the indexed full-text schema from app.models.product_search; every token is
+    prefix-matched so partial words typed by shoppers still hit. Falls back to ILIKE
+    (with no ranking) on other dialects or when the query has no searchable tokens.
+    """
+    tokens = tokenize(q)
+    dialect = db.get_bind().dialect.name
+    if not tokens or dialect not in ("postgresql", "sqlite"):
+        return qset.filter(_ilike_clause(q)), None
+    if dialect == "postgresql":
+        tsq = func.to_tsquery("simple", bindparam("fts_q", " & ".join(f"{t}:*" for t in tokens)))
+        vector = literal_column("products.search_vector")
+        return qset.filter(vector.op("@@")(tsq)), func.ts_rank_cd(vector, tsq)
+    # sqlite fts5: implicit AND of quoted prefix terms; bm25() is lower-is-better
+    fts = (
+        text(
+            "SELECT product_id AS fts_product_id, bm25(products_search_fts, 10.0, 4.0, 1.0) AS score "
+            "FROM products_search_fts WHERE products_search_fts MATCH :fts_q"
+        )
+        .bindparams(fts_q=" ".join(f'"{t}"*' for t in tokens))
+        .columns(column("fts_product_id"), column("score", Float))
+        .subquery("fts")
+    )
+    qset = qset.join(fts, fts.c.fts_product_id == Product.id)
+    return qset, -fts.c.score
+
+
+def fuzzy_search(qset: Query, db: Session, q: str, threshold: float, max_candidates: int) -> Tuple[Query, ColumnElement]:
+    """Typo-tolerant match on Postgres via the pg_trgm index; returns (query, similarity).
+
+    Only the max_candidates most similar rows are kept, which keeps the cost of very loose
+    queries bounded.
+    """
+    db.execute(text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"), {"t": str(threshold)})
+    doc = literal_column(FUZZY_DOC_SQL)
+    needle = bindparam("fuzzy_q", " ".join(tokenize(q)))
+    similarity = func.word_similarity(needle, doc)
+    candidates = (
+        select(Product.id.label("fuzzy_id"), similarity.label("similarity"))
+        .where(needle.op("<%")(doc), Product.is_active == True, Product.status == ProductStatus.active)
+        .order_by(similarity.desc(), Product.id)
+        .limit(max_candidates)
+        .subquery("fuzzy")
+    )
+    qset = qset.join(candidates, candidates.c.fuzzy_id == Product.id)
+    return qset, candidates.c.similarity
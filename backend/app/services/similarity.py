@@ -0,0 +1,173 @@
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, load_only
+from app.models.product import Product, ProductStatus
+from app.services.index_refresh import IndexBuild, SwappableIndex, refresh_on_remote_writes
+from app.services.search_index import is_searchable
+from app.services.search_service import tokenize
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20
+# features shared by more than this share of the catalog ("skin:all") carry almost no idf
+# but would make candidate generation quadratic, so they are not used to find neighbours
+MAX_DF_FRACTION = 0.2
+
+_PHRASE_SPLIT = re.compile(r"[,;\n]+")
+
+
+def _phrases(text: Optional[str]) -> List[str]:
+    return [p.strip().lower() for p in _PHRASE_SPLIT.split(text or "") if p.strip()]
+
+
+def _list(val) -> List[str]:
+    return [str(v).strip().lower() for v in val if str(v).strip()] if isinstance(val, list) else []
+
+
+def product_features(product: Product) -> Counter:
+    feats: Counter = Counter()
+    feats.update(f"tag:{t}" for t in _list(product.tags))
+    feats.update(f"ing:{i}" for i in _phrases(product.ingredients))
+    feats.update(f"ben:{t}" for t in tokenize(product.benefits or ""))
+    feats.update(f"skin:{t}" for t in _list(product.skin_type))
+    feats.update(f"hair:{t}" for t in _list(product.hair_type))
+    return feats
+
+
+class SimilarProductsIndex(SwappableIndex):
+    """Content-based neighbours: TF-IDF vectors over tags, ingredients, benefits and skin/hair types.
+
+    Vectors are sparse dicts, L2-normalised, with an inverted index for candidate generation;
+    each product's top-k cosine neighbours are precomputed. `upsert` recomputes one product's
+    row (idf from current document frequencies, other rows are not reweighted) and patches it
+    into the lists of the products it is now close to.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self.df: Counter = Counter()
+        self.vectors: dict[str, dict[str, float]] = {}
+        self.postings: dict[str, dict[str, float]] = {}
+        self.neighbours: dict[str, List[Tuple[str, float]]] = {}
+        self.listed_in: dict[str, set] = {}  # product -> products whose neighbour list holds it
+        self.ready = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _vector(self, feats: Counter, n: int) -> dict[str, float]:
+        vec = {f: (1 + math.log(tf)) * (math.log((n + 1) / (self.df[f] + 1)) + 1) for f, tf in feats.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {f: w / norm for f, w in vec.items()}
+
+    def _scores(self, product_id: str) -> List[Tuple[str, float]]:
+        max_df = max(10, MAX_DF_FRACTION * len(self.vectors))
+        acc: dict[str, float] = {}
+        for f, w in self.vectors[product_id].items():
+            docs = self.postings.get(f, {})
+            if len(docs) > max_df:
+                continue
+            for d, w2 in docs.items():
+                if d != product_id:
+                    acc[d] = acc.get(d, 0.0) + w * w2
+        return [(d, round(s, 6)) for d, s in heapq.nlargest(self.top_k, acc.items(), key=itemgetter(1))]
+
+    def _set_neighbours(self, product_id: str, top: List[Tuple[str, float]]):
+        for d, _ in self.neighbours.get(product_id, ()):
+            self.listed_in.get(d, set()).discard(product_id)
+        self.neighbours[product_id] = top
+        for d, _ in top:
+            self.listed_in.setdefault(d, set()).add(product_id)
+
+    def _empty(self) -> "SimilarProductsIndex":
+        return SimilarProductsIndex(self.top_k)
+
+    def _products(self, db: Session, batch_size: int):
+        cols = [Product.tags, Product.ingredients, Product.benefits, Product.skin_type, Product.hair_type, Product.is_active, Product.status]
+        return (
+            db.query(Product)
+            .options(load_only(*cols))
+            .filter(Product.is_active == True, Product.status == ProductStatus.active)
+            .yield_per(batch_size)
+        )
+
+    def build_from(self, products: Iterable[Product]) -> int:
+        started = time.perf_counter()
+        feats = {p.id: product_features(p) for p in products}
+        with self._lock:
+            self.df = Counter(f for fs in feats.values() for f in fs)
+            self.vectors, self.postings, self.neighbours, self.listed_in = {}, {}, {}, {}
+            n = len(feats)
+            for pid, fs in feats.items():
+                self.vectors[pid] = self._vector(fs, n)
+                for f, w in self.vectors[pid].items():
+                    self.postings.setdefault(f, {})[pid] = w
+            for pid in self.vectors:
+                self._set_neighbours(pid, self._scores(pid))
+            self.ready = True
+        logger.info("Similar-products index built with %d products in %.2fs", len(feats), time.perf_counter() - started)
+        return len(feats)
+
+    def upsert(self, product: Product):
+        if not is_searchable(product):
+            self.remove(product.id)
+            return
+        feats = product_features(product)
+        with self._lock:
+            self._remove_locked(product.id)
+            self.df.update(feats.keys())
+            vec = self._vector(feats, len(self.vectors) + 1)
+            self.vectors[product.id] = vec
+            for f, w in vec.items():
+                self.postings.setdefault(f, {})[product.id] = w
+            top = self._scores(product.id)
+            self._set_neighbours(product.id, top)
+            # cosine is symmetric: offer this product to the lists of its neighbours
+            for d, score in top:
+                current = self.neighbours.setdefault(d, [])
+                if len(current) >= self.top_k and score <= current[-1][1]:
+                    continue
+                pos = next((i for i, (_, s) in enumerate(current) if s < score), len(current))
+                current.insert(pos, (product.id, score))
+                self.listed_in.setdefault(product.id, set()).add(d)
+                if len(current) > self.top_k:
+                    dropped, _ = current.pop()
+                    self.listed_in.get(dropped, set()).discard(d)
+
+    def remove(self, product_id: str):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _remove_locked(self, product_id: str):
+        vec = self.vectors.pop(product_id, None)
+        if vec is None:
+            return
+        for f in vec:
+            self.df[f] -= 1
+            if self.df[f] <= 0:
+                del self.df[f]
+            docs = self.postings.get(f)
+            if docs is not None:
+                docs.pop(product_id, None)
+                if not docs:
+                    del self.postings[f]
+        self._set_neighbours(product_id, [])
+        del self.neighbours[product_id]
+        for d in list(self.listed_in.pop(product_id, ())):
+            self.neighbours[d] = [(x, s) for x, s in self.neighbours.get(d, []) if x != product_id]
+
+    def similar(self, product_id: str, limit: int = 8) -> List[str]:
+        return [d for d, _ in self.neighbours.get(product_id, ())[:limit]]
+
+
+similar_index = SimilarProductsIndex()
+similar_build = IndexBuild("similar-products", similar_index)
+refresh_on_remote_writes(similar_build)
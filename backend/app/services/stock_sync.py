@@ -0,0 +1,117 @@
+import logging
+from collections import Counter
+from typing import List, Optional
+from sqlalchemy import and_, false, literal, select, union_all, update
+from sqlalchemy.orm import Session
+from app.models.product import Product, ProductStatus
+from app.models.product_variant import ProductVariant
+from app.schemas.product import StockUpdateItem
+from app.services.facet_service import apply_facet_counts, price_bucket_label
+
+logger = logging.getLogger(__name__)
+
+
+def _result(item: StockUpdateItem, status: str, error: Optional[str] = None, kind=None, id=None) -> dict:
+    return {"sku": item.sku, "status": status, "kind": kind, "id": id, "error": error}
+
+
+def _invalid(item: StockUpdateItem) -> Optional[str]:
+    if item.inventory_quantity is None and item.price is None and item.compare_price is None:
+        return "Nothing to update"
+    if item.inventory_quantity is not None and item.inventory_quantity < 0:
+        return "Inventory cannot be negative"
+    if (item.price is not None and item.price < 0) or (item.compare_price is not None and item.compare_price < 0):
+        return "Price cannot be negative"
+    return None
+
+
+def _money(value) -> Optional[float]:
+    return None if value is None else round(float(value), 2)
+
+
+def _lookup(db: Session, skus: List[str]) -> dict:
+    """sku -> matching rows across products and variants, in one round trip."""
+    products = select(
+        literal("product").label("kind"), Product.sku, Product.id, Product.inventory_quantity,
+        Product.base_price.label("price"), Product.compare_price,
+        and_(Product.is_active == True, Product.status == ProductStatus.active).label("listed"),
+    ).where(Product.sku.in_(skus))
+    variants = select(
+        literal("variant"), ProductVariant.sku, ProductVariant.id, ProductVariant.inventory_quantity,
+        ProductVariant.price, ProductVariant.compare_price, false(),
+    ).where(ProductVariant.sku.in_(skus))
+    found: dict = {}
+    for row in db.execute(union_all(products, variants)):
+        found.setdefault(row.sku, []).append(row)
+    return found
+
+
+def apply_stock_updates(db: Session, items: List[StockUpdateItem]) -> dict:
+    """Set inventory/prices for many product and variant SKUs in one transaction.
+
+    SKUs are resolved with one query; rows whose values already match are left alone and
+    the rest are written with one executemany UPDATE per table. Cache invalidation happens
+    once, on commit, through the session listeners.
+    """
+    results: List[Optional[dict]] = [None] * len(items)
+    pending: dict[str, int] = {}
+    for i, item in enumerate(items):
+        error = "SKU repeated in request" if item.sku in pending else _invalid(item)
+        if error:
+            results[i] = _result(item, "invalid", error)
+        else:
+            pending[item.sku] = i
+
+    found = _lookup(db, list(pending)) if pending else {}
+    product_rows, variant_rows = [], []
+    added, removed = Counter(), Counter()
+    for sku, i in pending.items():
+        item, rows = items[i], found.get(sku)
+        if not rows:
+            results[i] = _result(item, "not_found", "Unknown SKU")
+            continue
+        if len(rows) > 1:
+            results[i] = _result(item, "invalid", "SKU matches both a product and a variant")
+            continue
+        row = rows[0]
+        price_col = "base_price" if row.kind == "product" else "price"
+        changes = {}
+        if item.inventory_quantity is not None and item.inventory_quantity != row.inventory_quantity:
+            changes["inventory_quantity"] = item.inventory_quantity
+        if item.price is not None and _money(item.price) != _money(row.price):
+            changes[price_col] = item.price
+        if item.compare_price is not None and _money(item.compare_price) != _money(row.compare_price):
+            changes["compare_price"] = item.compare_price
+        if not changes:
+            results[i] = _result(item, "unchanged", kind=row.kind, id=row.id)
+            continue
+        if row.kind == "product":
+            product_rows.append({"id": row.id, **changes})
+            # base price drives the price-range facet of listed products
+            if row.listed and "base_price" in changes:
+                old, new = price_bucket_label(row.price), price_bucket_label(item.price)
+                if old != new:
+                    removed[("price", old)] += 1
+                    added[("price", new)] += 1
+        else:
+            variant_rows.append({"id": row.id, **changes})
+        results[i] = _result(item, "updated", kind=row.kind, id=row.id)
+
+    # ORM bulk UPDATE by primary key: one executemany per distinct set of changed columns
+    if product_rows:
+        db.execute(update(Product), product_rows)
+    if variant_rows:
+        db.execute(update(ProductVariant), variant_rows)
+    apply_facet_counts(db, added, removed)
+    db.commit()
+
+    statuses = Counter(r["status"] for r in results)
+    logger.info("Stock sync: %d items, %d updated", len(items), statuses["updated"])
+    return {
+        "received": len(items),
+        "updated": statuses["updated"],
+        "unchanged": statuses["unchanged"],
+        "not_found": statuses["not_found"],
+        "invalid": statuses["invalid"],
+        "results": results,
+    }
@@ -1,31 +1,583 @@
+import json
+import logging
+import os
+import sys
+import threading
 import time
-from typing import Any, Dict, Tuple
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def approx_size(obj: Any, _depth: int = 0, _seen: Optional[set] = None) -> int:
+    """Rough deep size in bytes of a cached value (containers, rows and ORM instances)."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(obj))
+    size = sys.getsizeof(obj, 64)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        items = [x for kv in obj.items() for x in kv]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = obj
+    elif hasattr(obj, "_mapping"):  # sqlalchemy Row
+        items = tuple(obj)
+    elif hasattr(obj, "__dict__"):
+        items = [v for k, v in vars(obj).items() if not k.startswith("_sa_")]
+    else:
+        return size
+    return size + sum(approx_size(x, _depth + 1, _seen) for x in items)
+
+
+FRESH, STALE = 1, 2
+# followers stop waiting on a stuck leader after this and load themselves
+LOAD_WAIT_SECONDS = 30
+_refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
 
 class TTLCache:
-    def __init__(self, ttl_seconds: int = 60, max_size: int = 512):
+    """Thread-safe LRU cache with per-entry TTL, an entry and byte budget, and hit/miss counters.
+
+    Expired entries are dropped on read and by a background sweeper shared by all caches.
+    `invalidate()` bumps the cache generation, which makes every older entry a miss in O(1).
+    `get_or_load()` coalesces concurrent misses and serves expired entries for up to
+    `stale_seconds` while one background refresh runs.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_size: int = 512, max_bytes: int = 16 * 1024 * 1024, name: str = "", stale_seconds: int = 0):
+        self.name = name
         self.ttl = ttl_seconds
+        self.stale_seconds = stale_seconds
         self.max_size = max_size
-        self.store: Dict[str, Tuple[float, Any]] = {}
+        self.max_bytes = max_bytes
+        # key -> (expires_at, size, value, generation); order is least -> most recently used
+        self.store: "OrderedDict[str, Tuple[float, int, Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.stale_hits = self.coalesced = self.refreshes = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def _lookup(self, key: str) -> Tuple[Any, Optional[int]]:
+        """(value, FRESH | STALE) or (None, None); stale entries are expired but within stale_seconds."""
+        with self._lock:
+            item = self.store.get(key)
+            if item is None:
+                return None, None
+            now = time.monotonic()
+            if item[3] != self.generation or item[0] + self.stale_seconds <= now:
+                self._drop(key)
+                self.expirations += 1
+                return None, None
+            self.store.move_to_end(key)
+            return item[2], (FRESH if item[0] > now else STALE)
+
+    def get(self, key: str, default: Any = None):
+        value, state = self._lookup(key)
+        if state == FRESH:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return default
+
+    def get_or_load(self, key: str, load: Callable[[], Any], refresh: Optional[Callable[[], Any]] = None) -> Any:
+        """Return the cached value, computing it with `load` at most once per key at a time.
+
+        A stale value is returned immediately and recomputed in the background with `refresh`
+        (defaults to `load`; pass one that does not depend on request-scoped state).
+        """
+        value, state = self._lookup(key)
+        if state == FRESH:
+            self.hits += 1
+            return value
+        if state == STALE:
+            self.stale_hits += 1
+            if key not in self._flights:
+                self.refreshes += 1
+                _refresher.submit(self._fly, key, refresh or load)
+            return value
+        self.misses += 1
+        return self._fly(key, load)
+
+    def _fly(self, key: str, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if not flight.done.wait(LOAD_WAIT_SECONDS):
+                return load()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._load(key, load)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _load(self, key: str, load: Callable[[], Any]) -> Any:
+        generation = self.generation
+        value = load()
+        if generation == self.generation:  # don't cache a value computed across an invalidation
+            self.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        size = approx_size(key) + approx_size(value)
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self.store:
+                self._drop(key)
+            self.store[key] = (expires, size, value, self.generation)
+            self.bytes += size
+            while len(self.store) > self.max_size or self.bytes > self.max_bytes:
+                self._drop(next(iter(self.store)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self.store:
+                self._drop(key)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.store.clear()
+            self.bytes = 0
+
+    def expire(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            dead = [k for k, (exp, _, _, gen) in self.store.items() if exp + self.stale_seconds <= now or gen != self.generation]
+            for k in dead:
+                self._drop(k)
+            self.expirations += len(dead)
+        return len(dead)
+
+    def _drop(self, key: str):
+        size = self.store.pop(key)[1]
+        self.bytes -= size
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.store),
+            "bytes": self.bytes,
+            "max_size": self.max_size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "generation": self.generation,
+        }
+
+
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+_sweeper: Optional[threading.Thread] = None
+SWEEP_INTERVAL_SECONDS = 30
+
+
+def _sweep():
+    while True:
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        for cache in list(_caches):
+            cache.expire()
+
+
+def _register(cache: TTLCache):
+    global _sweeper
+    _caches.add(cache)
+    if _sweeper is None:
+        _sweeper = threading.Thread(target=_sweep, name="cache-expiry", daemon=True)
+        _sweeper.start()
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {c.name: c.stats() for c in _caches if c.name}
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+# larger writes are announced without ids; patching that many rows in place costs about a rebuild
+MAX_PUBLISHED_IDS = 1000
+# tags this process's invalidation messages so its subscriber can skip them
+PROCESS_ID = uuid.uuid4().hex
+
+
+def _new_process_id():
+    # workers forked from a preloaded app must not share the parent's id
+    global PROCESS_ID
+    PROCESS_ID = uuid.uuid4().hex
+
+
+os.register_at_fork(after_in_child=_new_process_id)
+
+
+class LocalBackend:
+    """In-process stand-in for Redis when REDIS_URL is not configured."""
+
+    def __init__(self):
+        self.store = TTLCache(ttl_seconds=3600, max_size=10_000, max_bytes=64 * 1024 * 1024)
+        self.counters: Dict[str, int] = {}
+        self.subscribers: list = []
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def set(self, key: str, data: str, ttl: int):
+        self.store.set(key, data, ttl=ttl)
+
+    def get_int(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+    def publish(self, channel: str, message: str):
+        for callback in list(self.subscribers):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None], on_connect: Optional[Callable[[], None]] = None):
+        self.subscribers.append(callback)
+
+    def lock(self, name: str, timeout: int):
+        # single process: TTLCache's in-process single-flight is enough
+        return None
 
-    def get(self, key: str):
-        now = time.time()
-        item = self.store.get(key)
-        if not item:
+    def locked(self, name: str) -> bool:
+        return False
+
+
+class RedisBackend:
+    """Shared L2 on Redis. Errors degrade to misses and skipped writes instead of failing requests.
+
+    An outage is not free, though: generation bumps and their messages are lost meanwhile, so
+    other workers keep serving their L1 copies (hence its short TTL) until TieredCache re-reads
+    the generations, which it does on resubscribe and periodically on lookups.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.errors = redis.RedisError
+        self.client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self.client.get(key)
+        except self.errors:
+            logger.warning("Redis cache read failed", exc_info=True)
             return None
-        ts, val = item
-        if now - ts > self.ttl:
-            self.store.pop(key, None)
+
+    def set(self, key: str, data: str, ttl: int):
+        try:
+            self.client.set(key, data, ex=ttl)
+        except self.errors:
+            logger.warning("Redis cache write failed", exc_info=True)
+
+    def get_int(self, key: str) -> Optional[int]:
+        try:
+            return int(self.client.get(key) or 0)
+        except self.errors:
+            return None
+
+    def incr(self, key: str) -> Optional[int]:
+        try:
+            return self.client.incr(key)
+        except self.errors:
+            logger.warning("Redis generation bump failed", exc_info=True)
             return None
-        return val
 
-    def set(self, key: str, value: Any):
-        if len(self.store) >= self.max_size:
-            # naive eviction: clear half
-            for k in list(self.store.keys())[: self.max_size // 2]:
-                self.store.pop(k, None)
-        self.store[key] = (time.time(), value)
+    def publish(self, channel: str, message: str):
+        try:
+            self.client.publish(channel, message)
+        except self.errors:
+            logger.warning("Redis invalidation publish failed", exc_info=True)
+
+    def lock(self, name: str, timeout: int):
+        """Acquired lock, False if another worker holds it, None if Redis is unavailable."""
+        try:
+            lock = self.client.lock(name, timeout=timeout)
+            return lock if lock.acquire(blocking=False) else False
+        except self.errors:
+            logger.warning("Redis lock failed", exc_info=True)
+            return None
+
+    def locked(self, name: str) -> Optional[bool]:
+        try:
+            return bool(self.client.exists(name))
+        except self.errors:
+            return None
+
+    def subscribe(self, channel: str, callback: Callable[[str], None], on_connect: Optional[Callable[[], None]] = None):
+        def listen():
+            while True:
+                try:
+                    pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(channel)
+                    if on_connect:
+                        on_connect()  # catch up on what was published while disconnected
+                    for msg in pubsub.listen():
+                        callback(msg["data"])
+                except self.errors:
+                    logger.warning("Redis invalidation subscriber disconnected; retrying", exc_info=True)
+                    time.sleep(5)
+
+        threading.Thread(target=listen, name="cache-invalidation", daemon=True).start()
+
+
+_backend = None
+_tiered: Dict[str, "TieredCache"] = {}
+_remote_listeners: Dict[str, list] = {}
+
+
+def on_remote_invalidation(name: str, callback: Callable[[Optional[List[str]]], None]):
+    """Call `callback(ids)` (on the subscriber thread) when another process invalidates cache `name`.
+
+    `ids` are the product ids the write touched, or None when they are not known (bulk
+    statements, lost messages), in which case anything derived from the catalog is suspect.
+    """
+    _remote_listeners.setdefault(name, []).append(callback)
+
+
+def _on_invalidation(message: str):
+    try:
+        data = json.loads(message)
+        name, generation, origin = data["c"], int(data["g"]), data["o"]
+        ids = data.get("ids")
+        if ids is not None and not isinstance(ids, list):
+            raise TypeError("ids")
+    except (ValueError, TypeError, KeyError, AttributeError):
+        logger.warning("Ignoring malformed cache invalidation message %r", message)
+        return
+    cache = _tiered.get(name)
+    if cache is None or origin == PROCESS_ID:
+        return  # our own bumps were applied when they were made
+    cache._advance(generation)
+    # every write from another process is news, even when its generation is not: concurrent
+    # writers' messages can arrive out of order, after a newer bump has already been seen
+    _notify(name, ids)
+
+
+def _notify(name: str, ids: Optional[List[str]] = None):
+    for callback in _remote_listeners.get(name, ()):
+        try:
+            callback(ids)
+        except Exception:
+            logger.exception("Invalidation listener for %s failed", name)
+
+
+def _resync_all():
+    for cache in list(_tiered.values()):
+        cache.check_generation(force=True)
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = RedisBackend(settings.REDIS_URL) if settings.REDIS_URL else LocalBackend()
+        _backend.subscribe(INVALIDATION_CHANNEL, _on_invalidation, on_connect=_resync_all)
+    return _backend
+
+
+class TieredCache(TTLCache):
+    """TTLCache (L1, per process) in front of a shared L2 (Redis, or LocalBackend without REDIS_URL).
+
+    Values must be JSON-serializable. L2 keys embed the namespace generation, which lives in the
+    L2 and is bumped by `invalidate()`; other workers learn the new generation over pub/sub,
+    and every L1 TTL each worker also re-reads it, in case a message was lost.
+    L2 entries carry a wall-clock expiry so workers agree on staleness, and with
+    CACHE_DISTRIBUTED_LOCK a miss is computed by one worker while the others wait for its result.
+    """
+
+    def __init__(self, name: str, ttl_seconds: int = 60, l1_ttl_seconds: Optional[int] = None, backend=None, **kw):
+        super().__init__(ttl_seconds=l1_ttl_seconds or ttl_seconds, name=name, **kw)
+        self.l2_ttl = ttl_seconds
+        self.backend = backend or get_backend()
+        self.l2_hits = self.l2_misses = 0
+        # set when a bump could not reach the L2; it is retried by check_generation()
+        self.bump_pending = False
+        generation = self.backend.get_int(self._gen_key)
+        self.generation = generation or 0
+        # an unreadable generation is re-read on the first lookup
+        self._check_at = 0.0 if generation is None else time.monotonic() + self.ttl
+        _tiered[name] = self
+
+    @property
+    def _gen_key(self) -> str:
+        return f"cache:{self.name}:gen"
+
+    def _l2_key(self, key: str, generation: int) -> str:
+        return f"cache:{self.name}:{generation}:{key}"
+
+    def _lookup(self, key: str) -> Tuple[Any, Optional[int]]:
+        value, state = super()._lookup(key)
+        if state == FRESH:
+            return value, state
+        self.check_generation()
+        generation = self.generation
+        data = self.backend.get(self._l2_key(key, generation))
+        if data is None:
+            self.l2_misses += 1
+            # an L1 entry past its TTL is still worth serving while one request refreshes it
+            return (value, state) if generation == self.generation else (None, None)
+        self.l2_hits += 1
+        envelope = json.loads(data)
+        remaining = envelope["e"] - time.time()
+        if remaining > 0 and generation == self.generation:
+            TTLCache.set(self, key, envelope["v"], ttl=min(remaining, self.ttl))
+        return envelope["v"], (FRESH if remaining > 0 else STALE)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        super().set(key, value, ttl=ttl)
+        ttl = ttl or self.l2_ttl
+        envelope = json.dumps({"v": value, "e": time.time() + ttl}, separators=(",", ":"), default=str)
+        self.backend.set(self._l2_key(key, self.generation), envelope, ttl + self.stale_seconds)
+
+    def _load(self, key: str, load: Callable[[], Any]) -> Any:
+        lock_name = f"cache:{self.name}:lock:{key}"
+        lock = self.backend.lock(lock_name, LOAD_WAIT_SECONDS) if settings.CACHE_DISTRIBUTED_LOCK else None
+        if lock is False:
+            # another worker is computing this key; pick its result up from the L2, but stop
+            # waiting once its lock is gone without one (its load failed, or it died)
+            deadline = time.monotonic() + LOAD_WAIT_SECONDS
+            released = False
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                data = self.backend.get(self._l2_key(key, self.generation))
+                if data is not None:
+                    envelope = json.loads(data)
+                    if envelope["e"] > time.time():
+                        return envelope["v"]
+                if released:
+                    break
+                # the leader writes the L2 before releasing, so look there once more first
+                released = not self.backend.locked(lock_name)
+            return super()._load(key, load)
+        try:
+            # the result goes into the L2 before the lock is released
+            return super()._load(key, load)
+        finally:
+            if lock:
+                try:
+                    lock.release()
+                except self.backend.errors:
+                    pass
+
+    def invalidate(self, ids: Optional[Iterable[str]] = None):
+        """Bump the generation and tell the other workers, with the product ids written if known."""
+        generation = self.backend.incr(self._gen_key)
+        if generation is None:
+            # inventing a local generation would drift from the shared counter; drop this
+            # process's copies instead and bump the L2 once it answers again
+            self.clear()
+            self.bump_pending = True
+            return
+        self.bump_pending = False
+        self._advance(generation)
+        ids = sorted(ids) if ids is not None and len(ids) <= MAX_PUBLISHED_IDS else None
+        message = json.dumps({"c": self.name, "g": generation, "o": PROCESS_ID, "ids": ids}, separators=(",", ":"))
+        self.backend.publish(INVALIDATION_CHANNEL, message)
+
+    def _advance(self, generation: int) -> bool:
+        with self._lock:
+            if generation > self.generation:
+                self.generation = generation
+                self.invalidations += 1
+                return True
+            return False
+
+    def check_generation(self, force: bool = False):
+        """Retry a failed bump, or adopt the L2's generation if it differs from ours.
+
+        Runs at most once per L1 TTL unless forced (the subscriber forces it on reconnect).
+        A generation that changed without us hearing of it means messages were lost, so the
+        remote-invalidation listeners are told as well.
+        """
+        now = time.monotonic()
+        if not force and now < self._check_at:
+            return
+        self._check_at = now + self.ttl
+        if self.bump_pending:
+            self.invalidate()
+            return
+        generation = self.backend.get_int(self._gen_key)
+        if generation is None or generation == self.generation:
+            return
+        with self._lock:
+            # also when it went down (the L2 lost its counter); L1 entries are tagged with
+            # generations, so drop them all rather than let an old number match again
+            self.generation = generation
+            self.store.clear()
+            self.bytes = 0
+            self.invalidations += 1
+        _notify(self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        out = super().stats()
+        out.update(l2_hits=self.l2_hits, l2_misses=self.l2_misses, l2=type(self.backend).__name__)
+        return out
+
+
+# catalog caches are invalidated on write (services/cache_invalidation), so TTLs only bound memory
+products_cache = TieredCache("products", ttl_seconds=6 * 3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_bytes=32 * 1024 * 1024, stale_seconds=settings.CACHE_STALE_SECONDS)
+# product pages show exact stock, so these are the entries inventory-only writes invalidate
+details_cache = TieredCache("details", ttl_seconds=6 * 3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_bytes=16 * 1024 * 1024, stale_seconds=settings.CACHE_STALE_SECONDS)
+tree_cache = TieredCache("tree", ttl_seconds=6 * 3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_size=16, max_bytes=2 * 1024 * 1024, stale_seconds=settings.CACHE_STALE_SECONDS)
+filters_cache = TieredCache("filters", ttl_seconds=6 * 3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_bytes=4 * 1024 * 1024, stale_seconds=settings.CACHE_STALE_SECONDS)
+search_cache = TieredCache("search", ttl_seconds=6 * 3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_bytes=16 * 1024 * 1024, stale_seconds=settings.CACHE_STALE_SECONDS)
+count_cache = TieredCache("counts", ttl_seconds=3600, l1_ttl_seconds=settings.CACHE_L1_SECONDS, max_size=256, max_bytes=1024 * 1024)
+
+CACHES = {
+    "products": products_cache, "details": details_cache, "tree": tree_cache,
+    "filters": filters_cache, "search": search_cache, "counts": count_cache,
+}
 
-products_cache = TTLCache(ttl_seconds=120)
-filters_cache = TTLCache(ttl_seconds=300)
-search_cache = TTLCache(ttl_seconds=120)
 
+def invalidate(*names: str, ids: Optional[Iterable[str]] = None):
+    if ids is not None:
+        ids = set(ids)
+    for name in names:
+        CACHES[name].invalidate(ids)
@@ -0,0 +1,51 @@
+import hashlib
+import json
+from typing import Any, Callable
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.utils.cache import TTLCache
+
+# clients may reuse a response but must revalidate it with If-None-Match
+CACHE_CONTROL = "no-cache"
+
+
+def _etag(body: str) -> str:
+    return '"' + hashlib.blake2b(body.encode(), digest_size=16).hexdigest() + '"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _respond(request: Request, entry: dict) -> Response:
+    headers = {"ETag": entry["etag"], "Cache-Control": CACHE_CONTROL}
+    if _matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+def _encode(data: Any) -> dict:
+    body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    return {"body": body, "etag": _etag(body)}
+
+
+def cached_json(request: Request, cache: TTLCache, key: str, build: Callable[[Session], Any], db: Session) -> Response:
+    """Serve `build(db)` (response-model output in json mode) from `cache` as encoded JSON with an ETag.
+
+    Hits skip pydantic and JSON encoding entirely; concurrent misses run `build` once, and stale
+    entries are refreshed in the background on a session of their own.
+    """
+    def refresh() -> dict:
+        session = SessionLocal()
+        try:
+            return _encode(build(session))
+        finally:
+            session.close()
+
+    entry = cache.get_or_load(key, lambda: _encode(build(db)), refresh=refresh)
+    return _respond(request, entry)
@@ -0,0 +1,72 @@
+"""Pillow helpers for product images.
+
+Kept free of app imports so `render_derivatives` can run in a spawned worker process
+without loading settings, models or the database engine.
+"""
+
+import os
+from typing import Optional
+from PIL import Image, ImageOps
+
+# derivative name -> longest edge in pixels; smaller sources are never upscaled
+DERIVATIVE_SIZES = {"zoom": 1600, "grid": 600, "thumbnail": 200}
+
+# Pillow format -> (file extension, save options)
+SAVE_OPTIONS = {
+    "JPEG": ("jpg", {"quality": 85, "optimize": True, "progressive": True}),
+    "PNG": ("png", {"optimize": True}),
+    "WEBP": ("webp", {"quality": 80, "method": 4}),
+}
+
+
+def probe(path: str) -> Optional[dict]:
+    """Format and size from the image header, or None if the file is not a supported image."""
+    try:
+        with Image.open(path) as im:
+            if im.format not in SAVE_OPTIONS:
+                return None
+            width, height = im.size
+            # EXIF orientations 5-8 are stored rotated by 90 degrees
+            if im.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+            return {"format": im.format, "width": width, "height": height}
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+
+def _save(im: Image.Image, fmt: str, out_dir: str, name: str) -> dict:
+    ext, options = SAVE_OPTIONS[fmt]
+    if fmt == "JPEG" and im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")
+    path = os.path.join(out_dir, f"{name}.{ext}")
+    tmp = path + ".tmp"
+    im.save(tmp, fmt, **options)
+    os.replace(tmp, path)
+    return {"file": os.path.basename(path), "size": os.path.getsize(path)}
+
+
+def render_derivatives(src: str, out_dir: str) -> dict:
+    """Write each derivative as WebP plus the source format; returns name -> dimensions and files.
+
+    Sizes are produced largest first, each resized from the previous one, so the full-size
+    image is only resampled once.
+    """
+    with Image.open(src) as original:
+        fmt = original.format
+        if original.format == "JPEG":
+            # let the decoder skip detail the zoom size will not use
+            original.draft("RGB", (DERIVATIVE_SIZES["zoom"], DERIVATIVE_SIZES["zoom"]))
+        im = ImageOps.exif_transpose(original)
+        if im.mode == "P":
+            im = im.convert("RGBA")
+        im.load()
+    out: dict = {}
+    for name, edge in DERIVATIVE_SIZES.items():
+        if max(im.size) > edge:
+            im = im.copy()
+            im.thumbnail((edge, edge), Image.LANCZOS)
+        formats = {"webp": _save(im, "WEBP", out_dir, name)}
+        if fmt != "WEBP":
+            formats[SAVE_OPTIONS[fmt][0]] = _save(im, fmt, out_dir, name)
+        out[name] = {"width": im.width, "height": im.height, "formats": formats}
+    return out
@@ -0,0 +1,118 @@
+import os
+import re
+from email.utils import formatdate
+from hashlib import md5
+from mimetypes import guess_type
+from typing import Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# content-addressed files never change under their URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+# anything else under the mount (legacy uploads) may be replaced in place
+MUTABLE = "public, max-age=3600"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange(FileResponse):
+    """206 response carrying bytes [start, end] of a file."""
+
+    def __init__(self, path: str, start: int, end: int, size: int, **kwargs):
+        headers = kwargs.pop("headers", {})
+        headers.update({"content-range": f"bytes {start}-{end}/{size}", "content-length": str(end - start + 1)})
+        super().__init__(path, status_code=206, headers=headers, **kwargs)
+        self.start, self.end = start, end
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:  # file shrank underneath us
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) for a single satisfiable range; (-1, -1) if unsatisfiable; None to serve the whole file."""
+    m = _RANGE.match((header or "").strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None  # absent, malformed or multi-range: a full 200 response is always allowed
+    first, last = m.group(1), m.group(2)
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            return -1, -1
+    if start >= size:
+        return -1, -1
+    return start, end
+
+
+class MediaFiles(StaticFiles):
+    """StaticFiles for uploads: long-lived caching, strong ETags and byte ranges.
+
+    Files under `immutable_prefix` are content-addressed (named by their SHA-256), so the
+    name is the ETag and they can be cached forever. `temp_prefix` is never served.
+    """
+
+    def __init__(self, *args, immutable_prefix: str = "media/", temp_prefix: str = "media/tmp/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefix = immutable_prefix
+        self.temp_prefix = temp_prefix
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        path = str(full_path)
+        rel = self.get_path(scope).replace(os.sep, "/")
+        if rel.startswith(self.temp_prefix):
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        request_headers = Headers(scope=scope)
+        if rel.startswith(self.immutable_prefix):
+            etag = '"' + os.path.splitext(os.path.basename(path))[0] + '"'
+            cache_control = IMMUTABLE
+        else:
+            etag = '"' + md5(f"{stat_result.st_mtime}-{stat_result.st_size}".encode(), usedforsecurity=False).hexdigest() + '"'
+            cache_control = MUTABLE
+        headers = {
+            "cache-control": cache_control, "accept-ranges": "bytes", "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        }
+        media_type = guess_type(path)[0] or "application/octet-stream"
+
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        size = stat_result.st_size
+        if_range = request_headers.get("if-range")
+        rng = _byte_range(request_headers.get("range"), size) if not if_range or if_range == etag else None
+        if rng == (-1, -1):
+            return Response(status_code=416, headers={"content-range": f"bytes */{size}", **headers})
+        if rng is not None:
+            return _FileRange(path, rng[0], rng[1], size, headers=headers, media_type=media_type,
+                              stat_result=stat_result, method=scope["method"])
+        return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result, method=scope["method"])
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # If-None-Match may list several tags (or *); when present it takes precedence over dates
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+            return "*" in tags or response_headers.get("etag") in tags
+        return super().is_not_modified(response_headers, request_headers)
@@ -0,0 +1,31 @@
+from typing import Iterable
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+
+def position_map(order: Iterable[dict]) -> dict[str, int]:
+    """id -> sort_order from a reorder payload; malformed entries are skipped, the first entry for an id wins."""
+    positions: dict[str, int] = {}
+    for o in order:
+        if not isinstance(o, dict):
+            continue
+        pos = o.get("sort_order")
+        if o.get("id") is not None and isinstance(pos, int) and not isinstance(pos, bool):
+            positions.setdefault(str(o["id"]), pos)
+    return positions
+
+
+def apply_positions(db: Session, model, positions: dict[str, int], *criteria) -> int:
+    """Set `sort_order` from an id -> position map; returns the number of rows changed. Does not commit.
+
+    Current positions are read in one query and only rows that move are written, with a single
+    executemany UPDATE by primary key. (A CASE expression with one WHEN per id is evaluated
+    linearly for every row, which made 1,000-item reorders several times slower.)
+    """
+    if not positions:
+        return 0
+    current = db.execute(select(model.id, model.sort_order).where(model.id.in_(list(positions)), *criteria))
+    rows = [{"id": id_, "sort_order": positions[id_]} for id_, pos in current if positions[id_] != pos]
+    if rows:
+        db.execute(update(model), rows)
+    return len(rows)
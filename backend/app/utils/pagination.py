@@ -0,0 +1,150 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Numeric, String, func, literal, select, tuple_
+from sqlalchemy.orm import Query
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+from app.core.config import settings
+from app.utils.cache import count_cache
+
+
+class Keyset:
+    """An ordering usable for cursor pagination: sort columns ending in a unique tiebreaker."""
+
+    def __init__(self, name: str, columns: Sequence[InstrumentedAttribute], descending: bool = True):
+        self.name = name
+        self.columns = list(columns)
+        self.descending = descending
+
+    def order_by(self) -> list:
+        return [c.desc() if self.descending else c.asc() for c in self.columns]
+
+    def values(self, obj: Any) -> list:
+        return [getattr(obj, c.key) for c in self.columns]
+
+
+def _dump(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return str(v)
+    if hasattr(v, "value"):  # enums
+        return v.value
+    return v
+
+
+def encode_cursor(keyset: Keyset, obj: Any) -> str:
+    raw = json.dumps({"s": keyset.name, "k": [_dump(v) for v in keyset.values(obj)]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(keyset: Keyset, cursor: str, dialect: str) -> list:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if data.get("s") != keyset.name or len(data.get("k", [])) != len(keyset.columns):
+            raise ValueError("cursor does not match sort")
+        out = []
+        for col, v in zip(keyset.columns, data["k"]):
+            if v is None:
+                raise ValueError("null sort key")
+            if isinstance(col.type, DateTime):
+                v = datetime.fromisoformat(v)
+                if dialect == "sqlite" and not v.microsecond:
+                    # CURRENT_TIMESTAMP values are stored without fractional seconds; compare as stored
+                    v = literal(v.strftime("%Y-%m-%d %H:%M:%S"), String)
+            elif isinstance(col.type, Numeric):
+                v = Decimal(v)
+            out.append(v)
+        return out
+    except (ValueError, TypeError, AttributeError, json.JSONDecodeError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _seek(qset: Query, keyset: Keyset, cursor: str) -> Query:
+    dialect = qset.session.get_bind().dialect.name
+    vals = decode_cursor(keyset, cursor, dialect)
+    key = tuple_(*keyset.columns)
+    return qset.filter(key < tuple_(*vals) if keyset.descending else key > tuple_(*vals))
+
+
+def next_page_cursor(keyset: Keyset, items: Sequence[Any], page: int, limit: int, total: int) -> Optional[str]:
+    # lets page/limit clients switch to cursor mode from any page
+    if not items or page * limit >= total:
+        return None
+    return encode_cursor(keyset, items[-1])
+
+
+def estimated_count(qset: Query, cached: bool = True) -> Optional[int]:
+    """Approximate row count for large listings.
+
+    Postgres reads the planner's row estimate (EXPLAIN); estimates under ESTIMATED_COUNT_MIN_ROWS
+    return None so the caller counts exactly. Other dialects serve a cached exact count, or
+    None without `cached` (for tables whose writes do not invalidate count_cache).
+    """
+    qset = qset.order_by(None)
+    bind = qset.session.get_bind()
+    if not cached and bind.dialect.name != "postgresql":
+        return None
+    compiled = qset.statement.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    if bind.dialect.name == "postgresql":
+        plan = qset.session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = int(plan[0]["Plan"]["Plan Rows"])
+        return rows if rows >= settings.ESTIMATED_COUNT_MIN_ROWS else None
+    key = f"{compiled}:{sorted(compiled.params.items(), key=lambda kv: kv[0])!r}"
+    total = count_cache.get(key)
+    if total is None:
+        total = qset.count()
+        count_cache.set(key, total)
+    return total
+
+
+def paginate(
+    qset: Query,
+    keyset: Keyset,
+    page: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    order_by: Optional[Sequence[Any]] = None,
+    estimate: bool = False,
+    cached_count: bool = True,
+) -> Tuple[List[Any], int, Optional[str], bool]:
+    """Fetch a page and its total in one statement.
+
+    Offset pages carry COUNT(*) OVER (); cursor pages carry a count of the unseeked query as a
+    scalar subquery. `order_by` replaces the keyset order for offset pages (e.g. relevance), which
+    then get no next cursor. `cached_count` is passed on to `estimated_count`.
+    Returns (items, total, next_cursor, total_is_estimated).
+    """
+    total = estimated_count(qset, cached_count) if estimate else None
+    estimated = total is not None
+    page_q = _seek(qset, keyset, cursor) if cursor else qset
+    if total is None:
+        if cursor:
+            total_col = select(func.count()).select_from(qset.order_by(None).subquery()).scalar_subquery()
+        else:
+            total_col = func.count().over()
+        page_q = page_q.add_columns(total_col.label("window_total"))
+    page_q = page_q.order_by(None)
+    if cursor:
+        rows = page_q.order_by(*keyset.order_by()).limit(limit + 1).all()
+    else:
+        rows = page_q.order_by(*(order_by or keyset.order_by())).offset((page - 1) * limit).limit(limit).all()
+    if total is None:
+        # an empty page past the end carries no window value
+        total = rows[0].window_total if rows else (qset.order_by(None).count() if cursor or page > 1 else 0)
+        if len(qset.column_descriptions) == 1:
+            # entity queries come back as (entity, total); column projections just keep the extra label
+            rows = [r[0] for r in rows]
+    if cursor:
+        has_more = len(rows) > limit
+        items = rows[:limit]
+        next_cursor = encode_cursor(keyset, items[-1]) if has_more and items else None
+    else:
+        items = rows
+        next_cursor = None if order_by is not None else next_page_cursor(keyset, items, page, limit, total)
+    return items, total, next_cursor, estimated
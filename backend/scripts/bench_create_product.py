@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Create-product benchmark: latency and SQL statements per POST /admin/products.
+
+Creates products with 1, 10 and 50 variants (plus a few images and a category) in a
+scratch database and reports median/p95 latency and the statements issued per request.
+
+Usage (from backend/): python scripts/bench_create_product.py [--repeat 50]
+"""
+
+import argparse
+import statistics
+import time
+
+from bench_env import reset_database, use_scratch_database
+
+use_scratch_database("create")
+
+from sqlalchemy import event  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.api.deps import require_admin_role  # noqa: E402
+
+VARIANT_COUNTS = (1, 10, 50)
+
+
+def payload(n_variants: int, seq: int, category_id: str) -> dict:
+    return {
+        "name": f"Bench Product {n_variants}-{seq}",
+        "sku": f"BENCH-{n_variants}-{seq}",
+        "base_price": 199,
+        "category_id": category_id,
+        "tags": ["herbal", "bench"],
+        "images": [{"image_url": f"/static/bench/{n_variants}-{seq}-{j}.jpg"} for j in range(3)],
+        "variants": [{"title": f"{j * 10}ml", "price": 199 + j, "sku": f"BENCH-{n_variants}-{seq}-{j}"} for j in range(n_variants)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    reset_database()
+    app.dependency_overrides[require_admin_role] = lambda: None
+    client = TestClient(app)
+    category_id = client.post("/api/v1/admin/categories", json={"name": "Bench"}).json()["id"]
+
+    statements = [0]
+
+    def _count(*_args, **_kw):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    print(f"{'variants':>8} {'median ms':>10} {'p95 ms':>8} {'statements':>11}")
+    for n in VARIANT_COUNTS:
+        samples, counts = [], []
+        for seq in range(args.repeat):
+            body = payload(n, seq, category_id)
+            statements[0] = 0
+            t0 = time.perf_counter()
+            r = client.post("/api/v1/admin/products", json=body)
+            samples.append((time.perf_counter() - t0) * 1000)
+            counts.append(statements[0])
+            assert r.status_code == 200, r.text
+        p95 = statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0]
+        print(f"{n:>8} {statistics.median(samples):>10.2f} {p95:>8.2f} {statistics.median(counts):>11.0f}")
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+if __name__ == "__main__":
+    main()
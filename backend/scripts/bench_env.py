@@ -0,0 +1,42 @@
+"""
+Scratch-database setup shared by the benchmark scripts.
+
+Benchmarks drop and recreate every table, so they always run against a throwaway SQLite
+file, never the DATABASE_URL of the environment (docker-compose points that at the app's
+Postgres). Call use_scratch_database() before importing anything from `app`: settings
+and the engine are created at import time.
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+_scratch_path = None
+
+
+def use_scratch_database(name: str) -> str:
+    """Point the app at tempdir/herbal_bench_<name>.db, overriding any DATABASE_URL."""
+    global _scratch_path
+    _scratch_path = os.path.join(tempfile.gettempdir(), f"herbal_bench_{name}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_scratch_path}"
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ["SEARCH_INDEX_ENABLED"] = "false"
+    if BACKEND_DIR not in sys.path:
+        sys.path.append(BACKEND_DIR)
+    return _scratch_path
+
+
+def reset_database():
+    """Drop and recreate all tables; refuses to touch anything but the scratch database."""
+    from app.core.database import Base, engine
+    import app.models  # noqa: F401
+    import app.models.order  # noqa: F401
+    import app.models.cart_item  # noqa: F401
+    import app.models.shopping_session  # noqa: F401
+
+    if _scratch_path is None or engine.url.get_backend_name() != "sqlite" or engine.url.database != _scratch_path:
+        raise SystemExit(f"Refusing to reset {engine.url!r}: not the benchmark scratch database")
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Reorder benchmark: id -> position map with one executemany UPDATE vs the previous per-row ORM loop.
+
+Seeds one product with N images and N variants plus N categories in a scratch database,
+then reverses each list through the admin reorder endpoints and through the old
+load-match-update loop, reporting wall time and SQL statements for each.
+
+Usage (from backend/): python scripts/bench_reorder.py [--items 1000]
+"""
+
+import argparse
+import time
+import uuid
+
+from bench_env import reset_database, use_scratch_database
+
+use_scratch_database("reorder")
+
+from sqlalchemy import event, insert  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core.database import engine, SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.api.deps import require_admin_role  # noqa: E402
+from app.models.category import Category  # noqa: E402
+from app.models.product import Product, ProductStatus  # noqa: E402
+from app.models.product_image import ProductImage  # noqa: E402
+from app.models.product_variant import ProductVariant  # noqa: E402
+
+TARGETS = [
+    ("images", ProductImage, "/api/v1/admin/products/images/reorder"),
+    ("variants", ProductVariant, "/api/v1/admin/products/variants/reorder"),
+    ("categories", Category, "/api/v1/admin/categories/reorder"),
+]
+
+
+def seed(n: int) -> dict:
+    reset_database()
+    pid = str(uuid.uuid4())
+    ids = {name: [str(uuid.uuid4()) for _ in range(n)] for name, _, _ in TARGETS}
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [{"id": pid, "name": "Reorder Bench", "slug": "reorder-bench", "base_price": 1,
+                                        "status": ProductStatus.active, "is_active": True}])
+        conn.execute(insert(ProductImage), [{"id": i, "product_id": pid, "image_url": f"/b/{k}.jpg", "sort_order": k}
+                                            for k, i in enumerate(ids["images"])])
+        conn.execute(insert(ProductVariant), [{"id": i, "product_id": pid, "title": f"v{k}", "price": 1, "sort_order": k}
+                                              for k, i in enumerate(ids["variants"])])
+        conn.execute(insert(Category), [{"id": i, "name": f"Cat {k}", "slug": f"cat-{k}", "full_path": f"cat-{k}", "sort_order": k}
+                                        for k, i in enumerate(ids["categories"])])
+    return ids
+
+
+def legacy_reorder(model, order):
+    """The previous implementation: load rows, linear scan of the payload per row, per-row UPDATE."""
+    db = SessionLocal()
+    try:
+        rows = db.query(model).filter(model.id.in_([o["id"] for o in order])).all()
+        for row in rows:
+            match = next((o for o in order if o.get("id") == row.id), None)
+            if match and isinstance(match.get("sort_order"), int):
+                row.sort_order = match["sort_order"]
+                db.add(row)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(fn):
+    statements = [0]
+
+    def _count(*_args, **_kw):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _count)
+    t0 = time.perf_counter()
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return (time.perf_counter() - t0) * 1000, statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    args = parser.parse_args()
+
+    ids = seed(args.items)
+    app.dependency_overrides[require_admin_role] = lambda: None
+    client = TestClient(app)
+    print(f"{'target':<11} {'path':<8} {'ms':>9} {'statements':>11}")
+    for name, model, url in TARGETS:
+        n = len(ids[name])
+        reverse = [{"id": i, "sort_order": 2 * n - 1 - k} for k, i in enumerate(ids[name])]
+        forward = [{"id": i, "sort_order": k} for k, i in enumerate(ids[name])]
+
+        def via_endpoint():
+            r = client.post(url, json=reverse)
+            assert r.status_code == 200 and r.json()["updated"] == n, r.text
+
+        ms, stmts = measure(via_endpoint)
+        print(f"{name:<11} {'bulk':<8} {ms:>9.1f} {stmts:>11}")
+        ms, stmts = measure(lambda: legacy_reorder(model, forward))
+        print(f"{name:<11} {'legacy':<8} {ms:>9.1f} {stmts:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Search benchmark: ILIKE scan vs database full-text vs in-process BM25 index.
+
+Builds a synthetic catalog (100k products by default) in a scratch database and
+times the same queries through each search path.
+
+Usage (from backend/): python scripts/bench_search.py [--products 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from bench_env import reset_database, use_scratch_database
+
+use_scratch_database("search")
+
+from sqlalchemy import insert  # noqa: E402
+from app.core.database import engine, SessionLocal  # noqa: E402
+from app.models.product import Product, ProductStatus  # noqa: E402
+from app.services.search_service import text_search, _ilike_clause  # noqa: E402
+from app.services.search_index import ProductSearchIndex  # noqa: E402
+
+HERBS = ["aloe", "neem", "tulsi", "ashwagandha", "amla", "bhringraj", "turmeric", "sandalwood", "saffron",
+         "rose", "hibiscus", "brahmi", "shikakai", "reetha", "lavender", "tea tree", "coconut", "almond"]
+KINDS = ["shampoo", "conditioner", "hair oil", "face wash", "cream", "serum", "soap", "scrub", "mask", "lotion"]
+WORDS = ["gentle", "nourishing", "herbal", "ayurvedic", "organic", "daily", "deep", "hydrating", "soothing",
+         "repair", "glow", "strength", "dandruff", "frizz", "acne", "dry", "oily", "sensitive", "natural", "care"]
+# filler vocabulary so description terms have a realistic (sparse) distribution
+FILLER = [f"{a}{b}{c}" for a in ("ka", "ri", "mo", "su", "te", "la", "vi", "no") for b in ("ran", "len", "dos", "mir", "tak")
+          for c in ("a", "o", "is", "um", "el", "ar", "in", "ex", "ul", "ot")]
+QUERIES = ["aloe", "neem face wash", "ashwagandha", "hair oil", "rose serum", "sham", "dandruff shampoo", "saffron glow"]
+
+
+def synthetic_rows(n: int, rng: random.Random):
+    for i in range(n):
+        herb, kind = rng.choice(HERBS), rng.choice(KINDS)
+        name = f"{herb.title()} {kind.title()} {i}"
+        yield {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "slug": f"{herb}-{kind}-{i}".replace(" ", "-"),
+            "short_description": " ".join(rng.choices(WORDS, k=6)),
+            "detailed_description": " ".join(rng.choices(FILLER, k=50) + rng.choices(WORDS + HERBS, k=10)),
+            "ingredients": ", ".join(rng.sample(HERBS, 4)),
+            "benefits": " ".join(rng.choices(WORDS, k=10)),
+            "tags": rng.sample(WORDS, 3),
+            "base_price": rng.randint(99, 2999),
+            "status": ProductStatus.active,
+            "is_active": True,
+        }
+
+
+def populate(n: int, chunk: int = 5000):
+    reset_database()
+    rng = random.Random(42)
+    rows = synthetic_rows(n, rng)
+    with engine.begin() as conn:
+        while True:
+            batch = [r for _, r in zip(range(chunk), rows)]
+            if not batch:
+                break
+            conn.execute(insert(Product), batch)
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    populate(args.products)
+    print(f"populated {args.products} products in {time.perf_counter() - t0:.1f}s ({engine.dialect.name})")
+
+    db = SessionLocal()
+    index = ProductSearchIndex()
+    t0 = time.perf_counter()
+    index.build(db)
+    print(f"built BM25 index in {time.perf_counter() - t0:.1f}s")
+
+    active = (Product.is_active == True, Product.status == ProductStatus.active)
+
+    def ilike(q):
+        return db.query(Product.id).filter(*active, _ilike_clause(q)).order_by(Product.created_at.desc()).limit(50).all()
+
+    def fulltext(q):
+        qset, rank = text_search(db.query(Product.id).filter(*active), db, q)
+        order = rank.desc() if rank is not None else Product.created_at.desc()
+        return qset.order_by(order).limit(50).all()
+
+    def bm25(q):
+        return index.search(q, limit=50)
+
+    print(f"\n{'query':<20}{'ilike ms':>12}{'fulltext ms':>14}{'bm25 ms':>12}{'hits':>8}")
+    for q in QUERIES:
+        row = [timed(lambda: fn(q), args.repeat) for fn in (ilike, fulltext, bm25)]
+        print(f"{q:<20}{row[0]:>12.2f}{row[1]:>14.2f}{row[2]:>12.3f}{len(bm25(q)):>8}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# settings are read at import time, so point them at a scratch database before importing the app
+_scratch = tempfile.mkdtemp(prefix="herbal-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["STATIC_FILES_PATH"] = os.path.join(_scratch, "uploads")
+os.makedirs(os.environ["STATIC_FILES_PATH"])
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["SEARCH_INDEX_ENABLED"] = "false"
+os.environ["MEDIA_GC_INTERVAL_SECONDS"] = "0"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+import app.models  # noqa: E402,F401
+import app.models.order  # noqa: E402,F401
+import app.models.cart_item  # noqa: E402,F401
+import app.models.shopping_session  # noqa: E402,F401
+from app.main import app  # noqa: E402
+from app.api.deps import require_admin_role  # noqa: E402
+from app.utils.cache import CACHES, invalidate  # noqa: E402
+
+Base.metadata.create_all(engine)
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Every test starts from empty tables and empty catalog caches."""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        conn.execute(text("DELETE FROM products_search_fts"))
+    invalidate(*CACHES)
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[require_admin_role] = lambda: None
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(require_admin_role, None)
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager yielding a one-item list with the number of statements executed inside it."""
+
+    @contextmanager
+    def counting():
+        counter = [0]
+
+        def _count(*_args, **_kw):
+            counter[0] += 1
+
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            yield counter
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+
+    return counting
+
+
+@pytest.fixture
+def make_product(client):
+    def make(name: str, **fields) -> dict:
+        body = {"name": name, "base_price": fields.pop("base_price", 100), **fields}
+        r = client.post("/api/v1/admin/products", json=body)
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return make
+
+
+@pytest.fixture
+def make_category(client):
+    def make(name: str, parent_id=None) -> dict:
+        r = client.post("/api/v1/admin/categories", json={"name": name, "parent_id": parent_id})
+        assert r.status_code == 200, r.text
+        return r.json()
+
+    return make
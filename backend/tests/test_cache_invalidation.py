@@ -0,0 +1,74 @@
+from app.core.database import SessionLocal
+from app.models.product import Product
+from app.utils.cache import CACHES, search_cache
+
+
+def _bumped(write) -> set:
+    before = {name: c.generation for name, c in CACHES.items()}
+    write()
+    return {name for name, c in CACHES.items() if c.generation != before[name]}
+
+
+def _update(product_id: str, **values):
+    def write():
+        db = SessionLocal()
+        try:
+            p = db.get(Product, product_id)
+            for k, v in values.items():
+                setattr(p, k, v)
+            db.commit()
+        finally:
+            db.close()
+    return write
+
+
+def test_stock_only_change_invalidates_only_product_pages(make_product):
+    p = make_product("Stocked Balm", track_inventory=True, inventory_quantity=10)
+    assert _bumped(_update(p["id"], inventory_quantity=4)) == {"details"}
+
+
+def test_going_out_of_stock_invalidates_listings(make_product):
+    p = make_product("Last One", track_inventory=True, inventory_quantity=1)
+    bumped = _bumped(_update(p["id"], inventory_quantity=0))
+    assert {"products", "details", "search"} <= bumped
+    assert "tree" not in bumped
+
+
+def test_content_change_invalidates_listings_and_search(make_product):
+    p = make_product("Renamed Balm")
+    bumped = _bumped(_update(p["id"], name="Renamed Balm II"))
+    assert {"products", "details", "search", "filters"} <= bumped
+    assert "tree" not in bumped
+
+
+def test_rolled_back_write_invalidates_nothing(make_product):
+    p = make_product("Unsaved Balm")
+
+    def write():
+        db = SessionLocal()
+        try:
+            db.get(Product, p["id"]).name = "Never saved"
+            db.flush()
+            db.rollback()
+        finally:
+            db.close()
+
+    assert _bumped(write) == set()
+
+
+def test_written_product_ids_are_published(make_product, monkeypatch):
+    p = make_product("Published Balm")
+    published = []
+    monkeypatch.setattr(search_cache, "invalidate", lambda ids=None: published.append(ids))
+    _update(p["id"], name="Published Balm II")()
+
+    def bulk_write():
+        db = SessionLocal()
+        try:
+            db.query(Product).filter(Product.brand == "Nobody").update({Product.tags: []})
+            db.commit()
+        finally:
+            db.close()
+
+    bulk_write()
+    assert published == [{p["id"]}, None]
@@ -0,0 +1,72 @@
+from sqlalchemy import delete
+from app.models.category import Category
+from app.models.category_closure import CategoryClosure
+from app.services.category_tree import ensure_category_closure
+
+
+def _closure(db) -> set:
+    return {(r.ancestor_id, r.descendant_id, r.depth) for r in db.query(CategoryClosure)}
+
+
+def _listed(client, slug: str, **params) -> set:
+    r = client.get(f"/api/v1/categories/{slug}/products", params=params)
+    assert r.status_code == 200, r.text
+    return {p["name"] for p in r.json()["items"]}
+
+
+def test_parent_listing_includes_descendants(client, make_category, make_product):
+    face = make_category("Face")
+    serums = make_category("Serums", parent_id=face["id"])
+    night = make_category("Night", parent_id=serums["id"])
+    make_product("Face Wash", category_id=face["id"])
+    make_product("Night Serum", category_id=night["id"])
+    make_product("Vitamin Serum", categories=[{"id": serums["id"]}])
+
+    assert _listed(client, "face") == {"Face Wash", "Night Serum", "Vitamin Serum"}
+    assert _listed(client, "serums") == {"Night Serum", "Vitamin Serum"}
+    assert _listed(client, "face", include_subcategories="false") == {"Face Wash"}
+
+
+def test_moving_a_subtree_updates_closure_and_paths(client, db, make_category, make_product):
+    face = make_category("Face")
+    body = make_category("Body")
+    serums = make_category("Serums", parent_id=face["id"])
+    night = make_category("Night", parent_id=serums["id"])
+    make_product("Night Serum", category_id=night["id"])
+
+    r = client.put(f"/api/v1/admin/categories/{serums['id']}", json={"parent_id": body["id"]})
+    assert r.status_code == 200, r.text
+    assert r.json()["full_path"] == "body/serums"
+
+    assert _closure(db) == {
+        (face["id"], face["id"], 0), (body["id"], body["id"], 0),
+        (serums["id"], serums["id"], 0), (night["id"], night["id"], 0),
+        (body["id"], serums["id"], 1), (body["id"], night["id"], 2), (serums["id"], night["id"], 1),
+    }
+    moved = db.get(Category, night["id"])
+    assert (moved.level, moved.full_path) == (2, "body/serums/night")
+    assert _listed(client, "face") == set()
+    assert _listed(client, "body") == {"Night Serum"}
+
+
+def test_circular_move_is_rejected(client, db, make_category):
+    face = make_category("Face")
+    serums = make_category("Serums", parent_id=face["id"])
+    night = make_category("Night", parent_id=serums["id"])
+    before = _closure(db)
+
+    r = client.put(f"/api/v1/admin/categories/{face['id']}", json={"parent_id": night["id"]})
+    assert r.status_code == 400
+    assert "Circular" in r.json()["detail"]
+    assert _closure(db) == before
+
+
+def test_closure_is_rebuilt_when_out_of_step(db, make_category):
+    face = make_category("Face")
+    make_category("Serums", parent_id=face["id"])
+    expected = _closure(db)
+    db.execute(delete(CategoryClosure).where(CategoryClosure.descendant_id == face["id"]))
+    db.commit()
+
+    ensure_category_closure(db)
+    assert _closure(db) == expected
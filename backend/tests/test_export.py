@@ -0,0 +1,17 @@
+import csv
+import gzip
+import io
+from app.services.product_export import CSV_COLUMNS
+
+
+def test_empty_catalog_exports_a_csv_header(client):
+    r = client.get("/api/v1/admin/products/export", params={"format": "csv"})
+    assert r.status_code == 200
+    assert list(csv.reader(io.StringIO(r.text))) == [CSV_COLUMNS]
+
+
+def test_csv_export_has_one_header(client, make_product):
+    make_product("Exported Balm")
+    r = client.get("/api/v1/admin/products/export", params={"format": "csv", "gzip": True})
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(r.content).decode())))
+    assert [row["name"] for row in rows] == ["Exported Balm"]
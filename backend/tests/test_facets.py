@@ -0,0 +1,85 @@
+from sqlalchemy import update
+from app.models.product import Product
+from app.models.product_facet import ProductFacet
+from app.services.facet_service import ensure_facets, facets_in_sync
+
+
+def _options(client) -> dict:
+    r = client.get("/api/v1/products/filter-options")
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _count(options: dict, facet: str, value: str) -> int:
+    return next((f["count"] for f in options["facets"].get(facet, []) if f["value"] == value), 0)
+
+
+def _price(options: dict, label: str) -> int:
+    return next(b["count"] for b in options["price_ranges"] if b["label"] == label)
+
+
+def test_counts_follow_creates_updates_and_deletes(client, db, make_product):
+    a = make_product("Neem Wash", brand="Leafy", tags=["neem", "face"], base_price=300)
+    make_product("Neem Oil", brand="Leafy", tags=["neem"], base_price=800)
+    options = _options(client)
+    assert options["brands"] == ["Leafy"]
+    assert _count(options, "brand", "Leafy") == 2
+    assert _count(options, "tag", "neem") == 2
+    assert _count(options, "tag", "face") == 1
+    assert _price(options, "Under 499") == 1
+    assert _price(options, "500 - 999") == 1
+
+    client.put(f"/api/v1/admin/products/{a['id']}", json={"brand": "Rooty", "tags": ["neem"], "base_price": 600})
+    options = _options(client)
+    assert _count(options, "brand", "Leafy") == 1
+    assert _count(options, "brand", "Rooty") == 1
+    assert "face" not in options["tags"]
+    assert _price(options, "Under 499") == 0
+    assert _price(options, "500 - 999") == 2
+
+    assert client.delete(f"/api/v1/admin/products/{a['id']}").status_code == 200
+    options = _options(client)
+    assert options["brands"] == ["Leafy"]
+    assert _count(options, "tag", "neem") == 1
+    assert _price(options, "500 - 999") == 1
+    assert facets_in_sync(db)
+
+
+def test_drifted_counts_are_rebuilt(client, db, make_product):
+    make_product("Neem Wash", brand="Leafy", base_price=300)
+    # a write that bypassed the API
+    db.execute(update(Product).values(brand="Rooty"))
+    db.query(ProductFacet).filter(ProductFacet.facet == "price").delete()
+    db.commit()
+    assert not facets_in_sync(db)
+
+    ensure_facets(db)
+    assert facets_in_sync(db)
+    options = _options(client)
+    assert options["brands"] == ["Rooty"]
+    assert _price(options, "Under 499") == 1
+
+
+def test_rebuild_endpoint_recounts(client, db, make_product):
+    make_product("Neem Wash", brand="Leafy", base_price=300)
+    db.execute(update(Product).values(brand="Rooty"))
+    db.commit()
+    r = client.post("/api/v1/admin/products/facets/rebuild")
+    assert r.status_code == 200, r.text
+    assert _options(client)["brands"] == ["Rooty"]
+
+
+def test_live_counts_normalize_values_like_the_materialized_ones(client, db, make_product):
+    make_product("Neem Wash", brand=" Leafy", tags=["neem ", "face"])
+    make_product("Neem Oil", brand="Leafy\t", tags=["neem", " "])
+    make_product("Plain Oil", brand="  ")
+    assert facets_in_sync(db)
+
+    r = client.get("/api/v1/products", params={"facets": "brand,tag"})
+    assert r.status_code == 200, r.text
+    live = r.json()["facets"]
+    assert live["brand"] == [{"value": "Leafy", "count": 2}]
+    assert live["tag"] == [{"value": "neem", "count": 2}, {"value": "face", "count": 1}]
+    options = _options(client)
+    assert _count(options, "brand", "Leafy") == 2
+    assert _count(options, "tag", "neem") == 2
@@ -0,0 +1,39 @@
+def test_listing_has_etag_and_answers_304_when_unchanged(client, make_product):
+    make_product("Etag Cream")
+    first = client.get("/api/v1/products")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = client.get("/api/v1/products", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    assert client.get("/api/v1/products", headers={"If-None-Match": '"other", ' + etag}).status_code == 304
+    assert client.get("/api/v1/products", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_etag_follows_the_response_body(client, make_product):
+    p = make_product("Etag Serum")
+    detail = client.get(f"/api/v1/products/{p['slug']}")
+    listing = client.get("/api/v1/products")
+
+    r = client.put(f"/api/v1/admin/products/{p['id']}", json={"short_description": "Now with aloe"})
+    assert r.status_code == 200, r.text
+    detail_after = client.get(f"/api/v1/products/{p['slug']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert detail_after.status_code == 200
+    assert detail_after.json()["short_description"] == "Now with aloe"
+    # listings do not show the description: rebuilt, but the same body and so the same ETag
+    assert client.get("/api/v1/products", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+
+    r = client.put(f"/api/v1/admin/products/{p['id']}", json={"base_price": 120})
+    assert r.status_code == 200, r.text
+    listing_after = client.get("/api/v1/products", headers={"If-None-Match": listing.headers["etag"]})
+    assert listing_after.status_code == 200
+    assert float(listing_after.json()["items"][0]["base_price"]) == 120
+
+
+def test_missing_product_is_not_cached_as_a_body(client):
+    r = client.get("/api/v1/products/no-such-product")
+    assert r.status_code == 404
+    assert "etag" not in r.headers
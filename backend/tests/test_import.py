@@ -0,0 +1,62 @@
+import json
+from app.models.product import Product
+from app.models.product_variant import ProductVariant
+
+CSV = """name,sku,base_price,brand,tags,inventory_quantity,variants
+Neem Wash,NW-1,300,Leafy,neem|face,5,
+,NO-NAME,100,,,,
+Aloe Gel,AG-1,abc,,,,
+Rose Water,RW-1,200,,,-3,
+Duplicate Wash,NW-1,300,,,,
+Tulsi Oil,TO-1,450,Leafy,,,"[{""title"": ""50ml"", ""sku"": ""TO-50"", ""price"": 450}]"
+Broken Variants,BV-1,100,,,,"[{oops"
+"""
+
+
+def _import(client, body: str, filename: str, **params):
+    r = client.post("/api/v1/admin/products/import", params=params, files={"file": (filename, body.encode())})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_bad_rows_are_reported_and_good_rows_created(client, db):
+    result = _import(client, CSV, "catalog.csv", batch_size=2)
+    assert (result["rows"], result["created"], result["failed"]) == (7, 2, 5)
+    errors = {e["row"]: e for e in result["errors"]}
+    assert sorted(errors) == [3, 4, 5, 6, 8]
+    assert "name" in errors[3]["error"]
+    assert errors[4]["sku"] == "AG-1" and "base_price" in errors[4]["error"]
+    assert errors[5]["error"] == "Inventory cannot be negative"
+    assert errors[6]["error"] == "Product SKU 'NW-1' already exists"
+    assert "variants: invalid JSON" in errors[8]["error"]
+
+    created = {p.sku: p for p in db.query(Product)}
+    assert set(created) == {"NW-1", "TO-1"}
+    assert created["NW-1"].tags == ["neem", "face"]
+    assert [v.sku for v in db.query(ProductVariant)] == ["TO-50"]
+    assert client.get("/api/v1/products/filter-options").json()["brands"] == ["Leafy"]
+
+
+def test_existing_skus_are_rejected_on_a_second_import(client):
+    _import(client, CSV, "catalog.csv")
+    again = _import(client, CSV, "catalog.csv")
+    assert again["created"] == 0
+    errors = {e["row"]: e["error"] for e in again["errors"]}
+    assert errors[2] == "Product SKU 'NW-1' already exists"
+    assert errors[7] == "Product SKU 'TO-1' already exists"
+
+
+def test_ndjson_import(client, db):
+    lines = [
+        json.dumps({"name": "Neem Wash", "sku": "NW-1", "base_price": 300}),
+        "{not json",
+        json.dumps(["not", "an", "object"]),
+        json.dumps({"name": "Rose Water", "sku": "RW-1", "base_price": 200, "categories": [{"id": "missing"}]}),
+    ]
+    result = _import(client, "\n".join(lines) + "\n", "catalog.ndjson")
+    assert (result["created"], result["failed"]) == (1, 3)
+    assert [(e["row"], e["error"]) for e in result["errors"][1:]] == [
+        (3, "Expected a JSON object"), (4, "Unknown category: missing"),
+    ]
+    assert result["errors"][0]["row"] == 2
+    assert db.query(Product.sku).scalar() == "NW-1"
@@ -0,0 +1,87 @@
+import time
+from app.core.database import SessionLocal
+from app.models.product import Product
+from app.services.index_refresh import IndexBuild
+from app.services.search_index import ProductSearchIndex
+
+
+def _wait(build: IndexBuild):
+    deadline = time.monotonic() + 10
+    while build.running:
+        assert time.monotonic() < deadline, "index build did not finish"
+        time.sleep(0.01)
+
+
+def _write(product_id: str, **values):
+    db = SessionLocal()
+    try:
+        p = db.get(Product, product_id)
+        for k, v in values.items():
+            setattr(p, k, v)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _names(index: ProductSearchIndex, q: str) -> set:
+    return {d for d, _ in index.search(q)}
+
+
+def test_announced_writes_are_patched_in_place(make_product):
+    kept = make_product("Neem Soap")
+    renamed = make_product("Tulsi Drops")
+    build = IndexBuild("test", ProductSearchIndex())
+    build.request()
+    _wait(build)
+    built_at = build.index.built_at
+
+    _write(renamed["id"], name="Brahmi Drops")
+    _write(kept["id"], is_active=False)
+    build.changed([renamed["id"], kept["id"]])
+    _wait(build)
+    assert _names(build.index, "brahmi") == {renamed["id"]}
+    assert _names(build.index, "tulsi") == _names(build.index, "neem") == set()
+    assert build.index.built_at == built_at  # no rebuild
+
+    build.changed(None)  # ids unknown: rebuild
+    _wait(build)
+    assert build.index.built_at > built_at
+    assert len(build.index) == 1
+
+
+class _SlowIndex(ProductSearchIndex):
+    """Runs `during_build` after the build has read the catalog, before it is swapped in."""
+
+    during_build = None
+
+    def _empty(self):
+        return ProductSearchIndex()
+
+    def _products(self, db, batch_size):
+        products = list(super()._products(db, batch_size))
+        self.during_build()
+        return products
+
+
+def test_writes_during_a_build_are_replayed_before_the_swap(make_product):
+    local = make_product("Amla Oil")
+    remote = make_product("Bhringraj Oil")
+    index = _SlowIndex()
+    build = IndexBuild("test", index)
+
+    def during_build():
+        _write(local["id"], name="Amla Hair Oil")
+        db = SessionLocal()
+        try:
+            build.upsert(db.get(Product, local["id"]))
+        finally:
+            db.close()
+        _write(remote["id"], name="Kumkumadi Oil")
+        build.changed([remote["id"]])
+
+    index.during_build = during_build
+    build.request()
+    _wait(build)
+    assert _names(index, "hair") == {local["id"]}
+    assert _names(index, "kumkumadi") == {remote["id"]}
+    assert _names(index, "bhringraj") == set()
@@ -0,0 +1,78 @@
+"""Statement counts must not grow with the number of rows returned or written (no N+1 loads)."""
+import pytest
+from app.utils.cache import CACHES, invalidate
+
+# upper bounds, so a regression shows up even if it costs the same for every page size
+LISTINGS = [
+    ("/api/v1/products", {"limit": "{n}"}, 2),
+    ("/api/v1/products", {"limit": "{n}", "q": "query"}, 2),
+    ("/api/v1/products/featured", {}, 1),
+    ("/api/v1/categories/query-count/products", {"limit": "{n}"}, 3),
+    ("/api/v1/admin/products", {"limit": "{n}"}, 4),
+]
+
+
+def _body(i: int, images: int = 3, variants: int = 2) -> dict:
+    return {
+        "name": f"Query Count Product {i}",
+        "base_price": 100 + i,
+        "is_featured": True,
+        "images": [{"image_url": f"/static/qc/{i}-{j}.jpg"} for j in range(images)],
+        "variants": [{"title": f"{j}ml", "price": 100 + j, "sku": f"QC-{i}-{j}"} for j in range(variants)],
+    }
+
+
+@pytest.fixture
+def catalog(make_category, make_product):
+    cat = make_category("Query Count")
+    return [make_product(**{**_body(i), "category_id": cat["id"]}) for i in range(12)]
+
+
+def _measure(client, count_queries, path, params=None) -> int:
+    invalidate(*CACHES)  # measure the database path, not a cached response
+    with count_queries() as counter:
+        r = client.get(path, params=params)
+    assert r.status_code == 200, r.text
+    return counter[0]
+
+
+@pytest.mark.parametrize("path,params,budget", LISTINGS)
+def test_listing_statements_do_not_depend_on_page_size(client, count_queries, catalog, path, params, budget):
+    counts = [
+        _measure(client, count_queries, path, {k: v.format(n=n) for k, v in params.items()})
+        for n in (1, 12)
+    ]
+    assert counts[0] == counts[1]
+    assert counts[0] <= budget
+
+
+def test_detail_loads_images_and_variants_in_batches(client, count_queries, catalog):
+    # one query for the product, one each for its images and variants
+    assert _measure(client, count_queries, f"/api/v1/products/{catalog[0]['slug']}") == 3
+
+
+def test_search_statements_do_not_depend_on_matches(client, count_queries, catalog, make_product):
+    make_product("Lonely Serum")
+    one = _measure(client, count_queries, "/api/v1/products/search", {"q": "lonely"})
+    many = _measure(client, count_queries, "/api/v1/products/search", {"q": "query"})
+    assert one == many
+    assert one <= 4
+
+
+def test_cached_response_runs_no_statements(client, count_queries, catalog):
+    client.get("/api/v1/products")
+    with count_queries() as counter:
+        assert client.get("/api/v1/products").status_code == 200
+    assert counter[0] == 0
+
+
+def test_create_product_statements_do_not_depend_on_children(client, count_queries, make_category):
+    cat = make_category("Query Count")
+    counts = []
+    for i, size in enumerate((1, 8)):
+        with count_queries() as counter:
+            r = client.post("/api/v1/admin/products", json={**_body(i, images=size, variants=size), "category_id": cat["id"], "tags": ["a", "b"]})
+        assert r.status_code == 200, r.text
+        counts.append(counter[0])
+    assert counts[0] == counts[1]
+    assert counts[0] <= 10
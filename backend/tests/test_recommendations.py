@@ -0,0 +1,81 @@
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from app.core.database import SessionLocal
+from app.models.order import Order, OrderItem, OrderStatus, OrderStatusHistory
+from app.services.recommendations import CoPurchaseRecommender
+
+
+def _order(product_ids, days_ago: float = 1, status=OrderStatus.confirmed) -> str:
+    db = SessionLocal()
+    try:
+        order = Order(
+            order_number=f"T-{time.monotonic_ns()}", customer_email="a@example.com", customer_phone="1",
+            status=status, created_at=datetime.now(timezone.utc) - timedelta(days=days_ago),
+        )
+        order.items = [
+            OrderItem(product_id=pid, product_name="x", quantity=1, unit_price=1, total_price=1) for pid in product_ids
+        ]
+        db.add(order)
+        db.commit()
+        return order.id
+    finally:
+        db.close()
+
+
+def _set_status(order_id: str, status: OrderStatus):
+    db = SessionLocal()
+    try:
+        db.get(Order, order_id).status = status
+        db.add(OrderStatusHistory(order_id=order_id, new_status=status.value))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _products(make_product, n: int) -> list:
+    return [make_product(f"Product {i}")["id"] for i in range(n)]
+
+
+def test_partners_are_reranked_when_order_counts_move(make_product, db):
+    a, b, c = _products(make_product, 3)
+    _order([a, b])
+    _order([b, c])
+    rec = CoPurchaseRecommender()
+    rec.build(db)
+
+    _order([a])  # n(a) grows without any pair changing
+    assert rec.sync(db) == 1
+    scores = dict(rec.neighbours[b])
+    assert scores[a] == round(1 / math.sqrt(2 * 2), 6)
+    assert rec.related(b) == [c, a]
+
+
+def test_only_recent_orders_are_reconciled(make_product, db):
+    a, b = _products(make_product, 2)
+    old = _order([a, b], days_ago=200)
+    recent = _order([a, b])
+    rec = CoPurchaseRecommender()
+    rec.build(db)
+    assert set(rec.counted) == {recent}
+
+    _set_status(recent, OrderStatus.cancelled)
+    _set_status(old, OrderStatus.refunded)
+    rec.sync(db)
+    # the old order stays folded in: it is outside the window
+    assert rec.pairs[a][b] == 1
+    assert rec.counted == {}
+
+
+def test_sync_runs_in_the_background(make_product, db):
+    a, b = _products(make_product, 2)
+    rec = CoPurchaseRecommender()
+    rec.build(db)
+    _order([a, b])
+
+    rec.request_sync(max_age=0)
+    deadline = time.monotonic() + 10
+    while rec.syncing:
+        assert time.monotonic() < deadline, "sync did not finish"
+        time.sleep(0.01)
+    assert rec.related(a) == [b]
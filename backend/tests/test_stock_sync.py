@@ -0,0 +1,48 @@
+from decimal import Decimal
+from app.models.product import Product
+from app.models.product_variant import ProductVariant
+
+
+def _sync(client, *items):
+    r = client.post("/api/v1/admin/products/stock", json={"items": list(items)})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_products_and_variants_are_updated_by_sku(client, db, make_product):
+    wash = make_product("Neem Wash", sku="NW-1", track_inventory=True, inventory_quantity=5, base_price=300)
+    oil = make_product("Tulsi Oil", sku="TO-1", variants=[{"title": "50ml", "sku": "TO-50", "price": 450, "inventory_quantity": 2}])
+
+    result = _sync(
+        client,
+        {"sku": "NW-1", "inventory_quantity": 9, "price": 320},
+        {"sku": "TO-50", "inventory_quantity": 0, "compare_price": 500},
+        {"sku": "TO-1", "price": 100},
+        {"sku": "NOPE", "inventory_quantity": 1},
+        {"sku": "NW-1", "inventory_quantity": 1},
+        {"sku": "NEG-1", "inventory_quantity": -1},
+        {"sku": "XX-1"},
+    )
+    assert [r["status"] for r in result["results"]] == ["updated", "updated", "unchanged", "not_found", "invalid", "invalid", "invalid"]
+    assert (result["received"], result["updated"], result["unchanged"], result["not_found"], result["invalid"]) == (7, 2, 1, 1, 3)
+    assert result["results"][0]["kind"] == "product" and result["results"][0]["id"] == wash["id"]
+    assert result["results"][1]["kind"] == "variant"
+    assert result["results"][4]["error"] == "SKU repeated in request"
+    assert result["results"][5]["error"] == "Inventory cannot be negative"
+    assert result["results"][6]["error"] == "Nothing to update"
+
+    p = db.get(Product, wash["id"])
+    assert (p.inventory_quantity, p.base_price) == (9, Decimal("320.00"))
+    v = db.query(ProductVariant).filter(ProductVariant.sku == "TO-50").one()
+    assert (v.inventory_quantity, v.compare_price) == (0, Decimal("500.00"))
+    assert db.get(Product, oil["id"]).base_price == Decimal("100.00")
+
+
+def test_synced_values_reach_cached_pages_and_facets(client, make_product):
+    p = make_product("Neem Wash", sku="NW-1", track_inventory=True, inventory_quantity=5, base_price=300)
+    assert client.get(f"/api/v1/products/{p['slug']}").json()["inventory_quantity"] == 5
+
+    _sync(client, {"sku": "NW-1", "inventory_quantity": 7, "price": 700})
+    assert client.get(f"/api/v1/products/{p['slug']}").json()["inventory_quantity"] == 7
+    ranges = {b["label"]: b["count"] for b in client.get("/api/v1/products/filter-options").json()["price_ranges"]}
+    assert (ranges["Under 499"], ranges["500 - 999"]) == (0, 1)
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from app.utils.cache import (
+    INVALIDATION_CHANNEL, MAX_PUBLISHED_IDS, PROCESS_ID, LocalBackend, TieredCache, _on_invalidation, on_remote_invalidation,
+)
+
+
+def _workers(name: str):
+    """Two TieredCaches sharing one backend, as two worker processes would share Redis."""
+    backend = LocalBackend()
+    backend.subscribe(INVALIDATION_CHANNEL, _on_invalidation)
+    return TieredCache(name, backend=backend), TieredCache(name, backend=backend)
+
+
+def _message(name: str, generation: int, origin: str = "other-worker", ids=None) -> str:
+    return json.dumps({"c": name, "g": generation, "o": origin, "ids": ids})
+
+
+def _invalidate_elsewhere(worker: TieredCache, ids=None):
+    """worker.invalidate() as run in another process: the message carries a foreign origin."""
+    generation = worker.backend.incr(worker._gen_key)
+    worker._advance(generation)
+    worker.backend.publish(INVALIDATION_CHANNEL, _message(worker.name, generation, ids=ids))
+
+
+def test_l2_entries_are_shared_between_workers():
+    a, b = _workers("test-shared")
+    calls = []
+    assert a.get_or_load("k", lambda: calls.append(1) or {"v": 1}) == {"v": 1}
+    assert b.get_or_load("k", lambda: calls.append(1) or {"v": 2}) == {"v": 1}
+    assert calls == [1]
+    assert b.l2_hits == 1
+
+
+def test_invalidation_reaches_other_workers():
+    a, b = _workers("test-invalidate")
+    a.get_or_load("k", lambda: 1)
+    assert b.get_or_load("k", lambda: 2) == 1
+    _invalidate_elsewhere(a)
+    assert a.generation == b.generation == 1
+    assert b.get_or_load("k", lambda: 3) == 3
+    assert a.get_or_load("k", lambda: 4) == 3
+
+
+def test_own_messages_are_skipped():
+    a, b = _workers("test-own")
+    fired = []
+    on_remote_invalidation("test-own", fired.append)
+    a.invalidate()
+    assert fired == []
+    assert b.generation == 0
+
+
+def test_published_ids_reach_listeners():
+    a, b = _workers("test-ids")
+    fired = []
+    on_remote_invalidation("test-ids", fired.append)
+    # the message from a.invalidate() is our own; deliver its payload as another worker's
+    sent = []
+    a.backend.publish = lambda channel, message: sent.append(message)
+    a.invalidate(ids={"p2", "p1"})
+    a.invalidate(ids=[f"p{i}" for i in range(MAX_PUBLISHED_IDS + 1)])
+    for message in sent:
+        _on_invalidation(message.replace(PROCESS_ID, "other-worker"))
+    assert fired == [["p1", "p2"], None]
+
+
+def test_listeners_fire_for_every_foreign_message():
+    a, b = _workers("test-listeners")
+    fired = []
+    on_remote_invalidation("test-listeners", fired.append)
+    _invalidate_elsewhere(a, ids=["p1"])
+    assert fired == [["p1"]]
+    # concurrent writers: a bump that arrives after a newer one still carries a write
+    _on_invalidation(_message("test-listeners", b.generation + 5, ids=["p2"]))
+    _on_invalidation(_message("test-listeners", b.generation - 1))
+    assert fired == [["p1"], ["p2"], None]
+    assert b.generation == 6
+    _on_invalidation("test-listeners:7")  # malformed
+    _on_invalidation(_message("test-listeners", 8, ids="p3"))
+    assert fired == [["p1"], ["p2"], None]
+
+
+class FlakyBackend(LocalBackend):
+    """LocalBackend that can be taken down like an unreachable Redis."""
+
+    down = False
+
+    def get(self, key):
+        return None if self.down else super().get(key)
+
+    def get_int(self, key):
+        return None if self.down else super().get_int(key)
+
+    def incr(self, key):
+        return None if self.down else super().incr(key)
+
+
+def test_failed_bump_is_retried_when_the_l2_is_back():
+    backend = FlakyBackend()
+    backend.subscribe(INVALIDATION_CHANNEL, _on_invalidation)
+    cache = TieredCache("test-flaky", backend=backend, l1_ttl_seconds=60)
+    cache.get_or_load("k", lambda: 1)
+
+    backend.down = True
+    cache.invalidate()
+    # no made-up local generation, but this process's copies are gone
+    assert (cache.generation, len(cache), cache.bump_pending) == (0, 0, True)
+    assert cache.get_or_load("k", lambda: 2) == 2
+
+    backend.down = False
+    cache.check_generation(force=True)
+    assert (cache.generation, backend.get_int(cache._gen_key), cache.bump_pending) == (1, 1, False)
+    assert cache.get_or_load("k", lambda: 3) == 3
+
+
+def test_lost_messages_are_caught_up_on_lookup():
+    a, b = _workers("test-lost")
+    fired = []
+    on_remote_invalidation("test-lost", fired.append)
+    b.get_or_load("k", lambda: 1)
+    b.backend.incr(b._gen_key)  # bumped elsewhere, message never delivered
+    assert b.get_or_load("k", lambda: 2) == 1  # L1 still fresh
+
+    b._check_at = 0  # the L1 TTL has passed
+    b.store.clear()
+    assert b.get_or_load("k", lambda: 3) == 3
+    assert b.generation == 1
+    assert fired == [None]  # which products changed is unknown
+
+
+class HeldLockBackend(LocalBackend):
+    """Another worker holds every load lock until `held` is cleared."""
+
+    held = True
+
+    def lock(self, name, timeout):
+        return False
+
+    def locked(self, name):
+        return self.held
+
+
+def test_waiters_stop_when_the_leader_gives_up():
+    backend = HeldLockBackend()
+    cache = TieredCache("test-leader-failed", backend=backend)
+    backend.held = False  # the leader's load raised and released the lock without a result
+    started = time.monotonic()
+    assert cache.get_or_load("k", lambda: "computed here") == "computed here"
+    assert time.monotonic() - started < 1
+
+
+def test_waiters_pick_up_the_leaders_result():
+    backend = HeldLockBackend()
+    cache = TieredCache("test-leader-done", backend=backend)
+
+    def leader():
+        time.sleep(0.2)
+        TieredCache("test-leader-done", backend=backend).set("k", "from leader")
+        backend.held = False
+
+    threading.Thread(target=leader).start()
+    assert cache.get_or_load("k", lambda: "computed here") == "from leader"
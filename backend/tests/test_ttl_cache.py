@@ -0,0 +1,57 @@
+from app.utils.cache import TTLCache, approx_size
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now the most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_byte_budget_is_enforced():
+    value = "x" * 1000
+    entry = approx_size("k0") + approx_size(value)
+    cache = TTLCache(max_size=100, max_bytes=entry * 3)
+    for i in range(10):
+        cache.set(f"k{i}", value)
+        assert cache.bytes <= cache.max_bytes
+    assert len(cache) == 3
+    assert cache.get("k9") == value and cache.get("k6") is None
+    # a value bigger than the whole budget is not cached at all
+    cache.set("huge", "x" * entry * 4)
+    assert cache.get("huge") is None and len(cache) == 3
+
+
+def test_expired_entries_miss_and_are_swept():
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("gone", 1, ttl=0)
+    cache.set("kept", 2)
+    assert cache.expire() == 1
+    assert cache.get("gone") is None
+    assert cache.get("kept") == 2
+    assert len(cache) == 1
+
+
+def test_invalidate_drops_every_entry_in_constant_time():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.invalidate()
+    assert cache.get("a") is None
+    cache.set("a", 2)
+    assert cache.get("a") == 2
+
+
+def test_stats_count_hits_and_misses():
+    cache = TTLCache(name="stats")
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert stats["bytes"] == cache.bytes > 0
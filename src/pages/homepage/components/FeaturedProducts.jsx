@@ -3,6 +3,14 @@ import Image from '../../../components/AppImage';
 import Icon from '../../../components/AppIcon';
 import Button from '../../../components/ui/Button';
 
+// listing endpoints return ProductSummary rows: the primary image plus its resized
+// derivatives once the upload has been processed
+const cardImageUrl = (product) =>
+  product?.primary_image_derivatives?.grid?.formats?.webp?.url ||
+  product?.primary_image ||
+  product?.images?.[0]?.image_url ||
+  '';
+
 const FeaturedProducts = () => {
   const [currentSlide, setCurrentSlide] = useState(0);
   const [items, setItems] = React.useState([]);
@@ -114,7 +122,7 @@ const FeaturedProducts = () => {
                 {/* Product Image */}
                 <div className="relative h-64 overflow-hidden">
                   <Image
-                    src={product?.images?.[0]?.image_url || product?.image_url || ''}
+                    src={cardImageUrl(product)}
                     alt={product?.name}
                     className="w-full h-full object-cover group-hover:scale-105 transition-natural-slow"
                   />